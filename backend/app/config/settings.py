@@ -19,14 +19,56 @@ class Settings(BaseSettings):
     # AI Model Configuration
     sql_model_url: str = os.getenv("SQL_MODEL_URL", "http://model-runner.docker.internal:12434")
     sql_model_name: str = os.getenv("SQL_MODEL_NAME", "hf.co/unsloth/gemma-3-270m-it-GGUF")
+    sql_model_connect_timeout: float = float(os.getenv("SQL_MODEL_CONNECT_TIMEOUT", "5.0"))
+    sql_model_read_timeout: float = float(os.getenv("SQL_MODEL_READ_TIMEOUT", "30.0"))
+    sql_model_max_retries: int = int(os.getenv("SQL_MODEL_MAX_RETRIES", "2"))
+    sql_model_retry_backoff: float = float(os.getenv("SQL_MODEL_RETRY_BACKOFF", "0.5"))
+    sql_model_max_connections: int = int(os.getenv("SQL_MODEL_MAX_CONNECTIONS", "10"))
+    sql_model_cache_prompt: bool = os.getenv("SQL_MODEL_CACHE_PROMPT", "True").lower() == "true"
+    # A pruned schema differs per question, so it breaks the prefix the model server reuses;
+    # by default it is only sent when prompt caching is off
+    sql_prompt_prune_schema: bool = os.getenv(
+        "SQL_PROMPT_PRUNE_SCHEMA", "False" if os.getenv("SQL_MODEL_CACHE_PROMPT", "True").lower() == "true" else "True"
+    ).lower() == "true"
     
     # API Configuration
     api_host: str = os.getenv("API_HOST", "0.0.0.0")
     api_port: int = int(os.getenv("API_PORT", "8000"))
+    api_workers: int = int(os.getenv("API_WORKERS", "1"))
     debug: bool = os.getenv("DEBUG", "False").lower() == "true"
+    health_probe_interval: float = float(os.getenv("HEALTH_PROBE_INTERVAL", "10.0"))
+    health_probe_timeout: float = float(os.getenv("HEALTH_PROBE_TIMEOUT", "5.0"))
+    rollup_refresh_interval: float = float(os.getenv("ROLLUP_REFRESH_INTERVAL", "300.0"))
+    
+    # Startup Warm-up Configuration
+    warmup_enabled: bool = os.getenv("WARMUP_ENABLED", "True").lower() == "true"
+    warmup_steps: str = os.getenv("WARMUP_STEPS", "pool,analytics,model")
+    warmup_db_connections: int = int(os.getenv("WARMUP_DB_CONNECTIONS", "5"))
+    
+    # Cache Configuration
+    response_cache_size: int = int(os.getenv("RESPONSE_CACHE_SIZE", "256"))
+    result_cache_entries: int = int(os.getenv("RESULT_CACHE_ENTRIES", "1024"))
+    result_cache_max_bytes: int = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    sql_cache_size: int = int(os.getenv("SQL_CACHE_SIZE", "512"))
+    sql_cache_path: str = os.getenv("SQL_CACHE_PATH", "")
+    shared_cache_path: str = os.getenv("SHARED_CACHE_PATH", "")
+    
+    # Query Execution Configuration
+    query_page_size: int = int(os.getenv("QUERY_PAGE_SIZE", "500"))
+    query_max_page_size: int = int(os.getenv("QUERY_MAX_PAGE_SIZE", "5000"))
+    query_token_secret: str = os.getenv("QUERY_TOKEN_SECRET", "")
+    query_max_rows: int = int(os.getenv("QUERY_MAX_ROWS", "1000"))
+    query_stream_max_rows: int = int(os.getenv("QUERY_STREAM_MAX_ROWS", "100000"))
+    query_max_estimated_rows: int = int(os.getenv("QUERY_MAX_ESTIMATED_ROWS", "1000000"))
+    query_timeout_ms: int = int(os.getenv("QUERY_TIMEOUT_MS", "10000"))
     
     # Data Path Configuration
     data_path: str = os.getenv("DATA_PATH", "/app/data")
+    parquet_export_dir: str = os.getenv("PARQUET_EXPORT_DIR", "")
+    
+    # Roster Load Configuration
+    delta_writes: bool = os.getenv("DELTA_WRITES", "True").lower() == "true"
+    delta_write_batch_size: int = int(os.getenv("DELTA_WRITE_BATCH_SIZE", "1000"))
     
     # CORS Configuration
     cors_origins: list = [
@@ -1,11 +1,25 @@
-from fastapi import FastAPI
+import asyncio
+import atexit
+import os
+import shutil
+import tempfile
+import time
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 import uvicorn
 
 from .config.settings import settings
 from .config.database import test_db_connection
 from .config.logging import setup_logging, get_logger
-from .routes import health, query, providers, analytics
+from .services.ai_service import ai_service
+from .services.health_service import health_service
+from .services.warmup_service import warmup_service
+from .services.data_service import data_service
+from .services.analytics_service import analytics_service
+from .routes import health, query, providers, analytics, metrics
+from .utils.metrics import HTTP_REQUESTS, HTTP_LATENCY
+from .utils.shared_store import SharedStore
 
 # Configure logging
 setup_logging()
@@ -27,8 +41,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Count requests and observe latency per route template (time to response headers)"""
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        route_path = route.path if route is not None else "unmatched"
+        HTTP_REQUESTS.inc(method=request.method, route=route_path, status=status)
+        HTTP_LATENCY.observe(time.perf_counter() - started, method=request.method, route=route_path)
+
+
 # Include routers
 app.include_router(health.router)
+app.include_router(metrics.router)
 app.include_router(query.router)
 app.include_router(providers.router)
 app.include_router(analytics.router)
@@ -41,6 +73,29 @@ app.add_api_route("/duplicates", get_duplicates, methods=["GET"], include_in_sch
 app.add_api_route("/process_csv", process_csv, methods=["POST"], include_in_schema=False)
 
 
+# Strong references to fire-and-forget startup tasks
+_background_tasks = set()
+
+
+def start_background_task(coroutine) -> None:
+    task = asyncio.create_task(coroutine)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def check_database_connection():
+    """Log whether the database is reachable and create missing tables, off the event loop"""
+    if await run_in_threadpool(test_db_connection):
+        logger.info("Database connection verified successfully")
+        try:
+            await run_in_threadpool(data_service.ensure_tables)
+        except Exception as e:
+            # Retried before the next roster load
+            logger.warning(f"Could not create tables: {str(e)}")
+    else:
+        logger.warning("Database connection failed - check configuration")
+
+
 @app.on_event("startup")
 async def startup_event():
     """Application startup event"""
@@ -48,23 +103,58 @@ async def startup_event():
     logger.info(f"Database URL: {settings.database_url}")
     logger.info(f"AI Model URL: {settings.sql_model_url}")
     
-    # Test database connection
-    if test_db_connection():
-        logger.info("Database connection verified successfully")
+    # Test database connection and create missing tables in the background,
+    # so startup never waits on the database
+    start_background_task(check_database_connection())
+    
+    # Probe database and AI model in the background for /health
+    health_service.start()
+    
+    # Rebuild date-dependent analytics rollups in the background once they go stale
+    analytics_service.start()
+    
+    # Warm pools, caches and the model in the background; /health/ready waits for it
+    if settings.warmup_enabled:
+        start_background_task(warmup_service.run(app))
     else:
-        logger.warning("Database connection failed - check configuration")
+        warmup_service.mark_ready()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Application shutdown event"""
     logger.info("Shutting down AI-Powered Database Query API...")
+    await health_service.stop()
+    await analytics_service.stop()
+    await ai_service.close()
+
+
+def prepare_shared_cache() -> None:
+    """
+    Point every worker at one fresh shared cache file before they start.
+    Workers are separate processes that read SHARED_CACHE_PATH from the environment.
+    Without a configured path the file goes in a new private (0700) temp directory:
+    cached values are unpickled, so no other local user may be able to write them.
+    """
+    if settings.shared_cache_path:
+        path = settings.shared_cache_path
+        SharedStore.reset(path)
+    else:
+        directory = tempfile.mkdtemp(prefix="app-backend-cache-")
+        atexit.register(shutil.rmtree, directory, ignore_errors=True)
+        path = os.path.join(directory, "cache.sqlite3")
+    os.environ["SHARED_CACHE_PATH"] = path
+    logger.info(f"Shared cache for {settings.api_workers} workers: {path}")
 
 
 if __name__ == "__main__":
+    if settings.api_workers > 1:
+        prepare_shared_cache()
     uvicorn.run(
         "app.main:app",
         host=settings.api_host,
         port=settings.api_port,
-        reload=settings.debug
+        # Reload and multiple workers are mutually exclusive in uvicorn
+        reload=settings.debug and settings.api_workers == 1,
+        workers=settings.api_workers
     )
@@ -1,9 +1,15 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+from datetime import datetime
 
 
 class QueryRequest(BaseModel):
     question: str
+    # "ndjson" and "csv" stream every row; "json" returns a QueryResponse
+    format: Literal["json", "ndjson", "csv"] = "json"
+    # Set page_size (or pass a continuation_token) to get one page of rows at a time
+    page_size: Optional[int] = Field(None, ge=1)
+    continuation_token: Optional[str] = None
 
 
 class QueryResponse(BaseModel):
@@ -12,12 +18,16 @@ class QueryResponse(BaseModel):
     results: List[dict]
     success: bool
     error: Optional[str] = None
+    next_token: Optional[str] = None
 
 
 class HealthResponse(BaseModel):
     status: str
     database: str
     ai_model: str
+    database_latency_ms: Optional[float] = None
+    ai_model_latency_ms: Optional[float] = None
+    checked_at: Optional[datetime] = None
 
 
 class Provider(BaseModel):
@@ -64,3 +74,5 @@ class DuplicatesResponse(BaseModel):
     clusters: List[ClusterInfo]
     total_clusters: int
     total_duplicates: int
+    limit: int
+    next_cursor: Optional[str] = None
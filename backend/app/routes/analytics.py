@@ -1,24 +1,52 @@
-from fastapi import APIRouter, Depends
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, Depends, Request
 from sqlalchemy.orm import Session
 from ..config.database import get_db
 from ..services.analytics_service import analytics_service
+from ..utils.cache import cached_response
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
 
 @router.get("/specialty-experience")
-async def get_specialty_experience_data(db: Session = Depends(get_db)):
+async def get_specialty_experience_data(request: Request, db: Session = Depends(get_db)):
     """Get specialty experience data for box plot visualization"""
-    return analytics_service.get_specialty_experience_data(db)
+    return cached_response(request, lambda: analytics_service.get_specialty_experience_data(db))
 
 
 @router.get("/providers-by-specialty")
-async def get_providers_by_specialty(db: Session = Depends(get_db)):
+async def get_providers_by_specialty(request: Request, db: Session = Depends(get_db)):
     """Get provider categorization data by specialty for pie chart visualization"""
-    return analytics_service.get_providers_by_specialty(db)
+    # Expired license counts change with the date, so the date is part of the cache key
+    return cached_response(
+        request,
+        lambda: analytics_service.get_providers_by_specialty(db),
+        extra=date.today().isoformat()
+    )
 
 
 @router.get("/providers-by-state")
-async def get_providers_by_state(db: Session = Depends(get_db)):
+async def get_providers_by_state(request: Request, db: Session = Depends(get_db)):
     """Get provider distribution data by state for bar chart visualization"""
-    return analytics_service.get_providers_by_state(db)
+    return cached_response(request, lambda: analytics_service.get_providers_by_state(db))
+
+
+@router.get("/providers-by-city")
+async def get_providers_by_city(request: Request, db: Session = Depends(get_db)):
+    """Get provider distribution data by city for bar chart visualization"""
+    return cached_response(request, lambda: analytics_service.get_providers_by_city(db))
+
+
+@router.get("/license-expirations")
+async def get_license_expiration_calendar(
+    request: Request,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: Session = Depends(get_db)
+):
+    """Get daily and monthly license expiration counts for calendar heatmap visualization (defaults to the current year)"""
+    today = date.today()
+    start = start or date(today.year, 1, 1)
+    end = end or date(today.year, 12, 31)
+    return cached_response(request, lambda: analytics_service.get_license_expiration_calendar(db, start, end))
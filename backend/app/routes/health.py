@@ -1,9 +1,8 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import text
-from ..config.database import get_db
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 from ..models.schemas import HealthResponse
-from ..services.ai_service import ai_service
+from ..services.health_service import health_service
+from ..services.warmup_service import warmup_service
 import logging
 
 logger = logging.getLogger(__name__)
@@ -17,20 +16,19 @@ async def root():
 
 
 @router.get("/health", response_model=HealthResponse)
-def health_check(db: Session = Depends(get_db)):
-    """Health check endpoint"""
-    try:
-        # Test database connection
-        db.execute(text("SELECT 1"))
-        db_status = "connected"
-    except Exception as e:
-        db_status = f"error: {str(e)}"
-    
-    # Test AI model connection
-    ai_status = ai_service.check_health()
-    
-    return HealthResponse(
-        status="healthy" if db_status == "connected" and ai_status == "connected" else "degraded",
-        database=db_status,
-        ai_model=ai_status
-    )
+async def health_check():
+    """Health check endpoint, served from the latest background probe"""
+    return HealthResponse(**health_service.status())
+
+
+@router.get("/health/live")
+async def liveness_check():
+    """Liveness endpoint: the process is up and serving, no dependencies are checked"""
+    return {"status": "alive"}
+
+
+@router.get("/health/ready")
+async def readiness_check():
+    """Readiness endpoint: 503 until the startup warm-up has completed"""
+    status = warmup_service.status()
+    return JSONResponse(status, status_code=200 if warmup_service.ready else 503)
@@ -0,0 +1,70 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from ..config.database import engine
+from ..services.ai_service import ai_service
+from ..services.query_governor import query_governor
+from ..utils.cache import response_cache, result_cache
+from ..utils.metrics import registry
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="", tags=["metrics"])
+
+
+def _pool_metrics():
+    """Connection pool gauges for config.database.engine (QueuePool)"""
+    pool = engine.pool
+    gauges = [
+        ("db_pool_size", "Configured connection pool size", "size"),
+        ("db_pool_checked_in", "Idle connections in the pool", "checkedin"),
+        ("db_pool_checked_out", "Connections currently in use", "checkedout"),
+        ("db_pool_overflow", "Connections open beyond the pool size", "overflow"),
+    ]
+    families = []
+    for name, help_text, method in gauges:
+        if hasattr(pool, method):
+            # QueuePool.overflow() counts up from -pool_size until the pool is full
+            value = max(getattr(pool, method)(), 0)
+            families.append((name, "gauge", help_text, [("", {}, value)]))
+    return families
+
+
+def _model_metrics():
+    stats = ai_service.stats()
+    return [
+        ("sql_model_calls_total", "counter", "SQL generation calls sent to the model", [("", {}, stats["model_calls"])]),
+        ("sql_model_coalesced_calls_total", "counter", "SQL generation requests that joined an in-flight call", [("", {}, stats["coalesced_calls"])]),
+        ("sql_model_in_flight", "gauge", "SQL generation calls currently in flight", [("", {}, stats["in_flight"])]),
+    ]
+
+
+def _cache_metrics():
+    caches = {
+        "response": response_cache.stats(),
+        "result": result_cache.stats(),
+        "sql": ai_service.sql_cache.stats(),
+        "governor": query_governor.stats(),
+    }
+    hits = []
+    for name, stats in caches.items():
+        # Near-matches count as hits for the SQL cache
+        hits.append(("", {"cache": name}, stats["hits"] + stats.get("similar_hits", 0)))
+    return [
+        ("cache_hits_total", "counter", "Cache lookups that returned a value", hits),
+        ("cache_misses_total", "counter", "Cache lookups that found nothing", [("", {"cache": name}, stats["misses"]) for name, stats in caches.items()]),
+        ("cache_hit_ratio", "gauge", "Cache hits over lookups since start", [("", {"cache": name}, stats["hit_ratio"]) for name, stats in caches.items()]),
+        ("cache_entries", "gauge", "Entries currently cached", [("", {"cache": name}, stats["entries"]) for name, stats in caches.items()]),
+        ("cache_bytes", "gauge", "Approximate bytes held by size-bounded caches", [("", {"cache": name}, stats["bytes"]) for name, stats in caches.items()]),
+    ]
+
+
+registry.add_collector(_pool_metrics)
+registry.add_collector(_model_metrics)
+registry.add_collector(_cache_metrics)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition of request, pool, model, cache and pipeline metrics"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, File, UploadFile
+from typing import Optional
+from fastapi import APIRouter, Depends, File, Query, Request, UploadFile
 from sqlalchemy.orm import Session
 from ..config.database import get_db
 from ..models.schemas import ProvidersResponse, DuplicatesResponse
 from ..services.data_service import data_service
+from ..utils.cache import cached_response
 
 router = APIRouter(prefix="/providers", tags=["providers"])
 
@@ -15,29 +17,61 @@ async def process_csv(file: UploadFile = File(...), db: Session = Depends(get_db
 
 @router.get("", response_model=ProvidersResponse)
 async def get_providers(
+    request: Request,
     page: int = 1, 
     limit: int = 20,
     db: Session = Depends(get_db)
 ):
     """Get paginated list of providers with specific columns"""
-    providers, total, total_pages = data_service.get_providers_paginated(db, page, limit)
+    def build() -> ProvidersResponse:
+        providers, total, total_pages = data_service.get_providers_paginated(db, page, limit)
+        
+        return ProvidersResponse(
+            providers=providers,
+            total=total,
+            page=page,
+            limit=limit,
+            total_pages=total_pages
+        )
     
-    return ProvidersResponse(
-        providers=providers,
-        total=total,
-        page=page,
-        limit=limit,
-        total_pages=total_pages
-    )
+    return cached_response(request, build)
 
 
 @router.get("/duplicates", response_model=DuplicatesResponse)
-async def get_duplicates(db: Session = Depends(get_db)):
-    """Get duplicate clusters with provider information"""
-    clusters, total_clusters, total_duplicates = data_service.get_duplicate_clusters(db)
+async def get_duplicates(
+    request: Request,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    min_score: Optional[float] = None,
+    max_score: Optional[float] = None,
+    npi_match: Optional[bool] = None,
+    phone_match: Optional[bool] = None,
+    min_size: Optional[int] = None,
+    max_size: Optional[int] = None,
+    state: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Get a page of duplicate clusters with provider information"""
+    def build() -> DuplicatesResponse:
+        clusters, total_clusters, total_duplicates, next_cursor = data_service.get_duplicate_clusters(
+            db,
+            limit=limit,
+            cursor=cursor,
+            min_score=min_score,
+            max_score=max_score,
+            npi_match=npi_match,
+            phone_match=phone_match,
+            min_size=min_size,
+            max_size=max_size,
+            state=state
+        )
+        
+        return DuplicatesResponse(
+            clusters=clusters,
+            total_clusters=total_clusters,
+            total_duplicates=total_duplicates,
+            limit=limit,
+            next_cursor=next_cursor
+        )
     
-    return DuplicatesResponse(
-        clusters=clusters,
-        total_clusters=total_clusters,
-        total_duplicates=total_duplicates
-    )
+    return cached_response(request, build)
@@ -1,22 +1,41 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import text
 from ..config.database import get_db
+from ..config.settings import settings
 from ..models.schemas import QueryRequest, QueryResponse
 from ..services.ai_service import ai_service
+from ..services.query_service import query_service
+from ..services.query_governor import query_governor
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/query", tags=["query"])
 
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv"
+}
+
 
 @router.post("", response_model=QueryResponse)
 async def query_database(request: QueryRequest, db: Session = Depends(get_db)):
     """Generate SQL query from natural language and execute it"""
+    if request.continuation_token:
+        # Continue a paginated query without calling the model again; the token carries
+        # the SQL as generated, which is governed again below. Invalid (400) and expired
+        # (410) tokens are returned as errors rather than as a failed query.
+        sql_query, offset, page_size = query_service.decode_token(request.continuation_token)
+    
     try:
-        # Generate SQL query using AI model
-        sql_query = ai_service.generate_sql_query(request.question)
+        from_cache = bool(request.continuation_token)
+        if not request.continuation_token:
+            # Generate SQL query using AI model
+            sql_query, from_cache = await ai_service.generate_sql_query(request.question)
+            offset = 0
+            page_size = min(request.page_size or settings.query_page_size, settings.query_max_page_size)
         
         if not sql_query:
             return QueryResponse(
@@ -29,32 +48,73 @@ async def query_database(request: QueryRequest, db: Session = Depends(get_db)):
         
         logger.info(f"Generated SQL: {sql_query}")
         
+        # Only read-only SQL runs, with a row limit, a plan cost ceiling and a time limit
+        paginated = bool(request.page_size or request.continuation_token)
+        row_limit = settings.query_stream_max_rows if request.format in STREAM_MEDIA_TYPES or paginated else settings.query_max_rows
+        try:
+            # Pages are cut by the database: one row past the page tells whether more follow
+            page = (offset, page_size + 1) if paginated and request.format not in STREAM_MEDIA_TYPES else None
+            governed_sql = await run_in_threadpool(query_governor.review, db, sql_query, row_limit, page)
+        except HTTPException as rejection:
+            await run_in_threadpool(ai_service.sql_cache.forget, request.question)
+            return QueryResponse(
+                question=request.question,
+                sql_query=sql_query,
+                results=[],
+                success=False,
+                error=rejection.detail
+            )
+        
         # Execute the query
         try:
-            result = db.execute(text(sql_query))
-            rows = result.fetchall()
+            next_token = None
+            if request.format in STREAM_MEDIA_TYPES:
+                stream = await run_in_threadpool(query_service.open_stream, governed_sql, request.format)
+            elif paginated:
+                results, has_more = await run_in_threadpool(query_service.execute_page, db, governed_sql, page_size)
+                if has_more:
+                    next_token = query_service.encode_token(sql_query, offset + page_size, page_size)
+            else:
+                results = await run_in_threadpool(query_service.execute, db, governed_sql)
             
-            # Convert to list of dictionaries
-            columns = result.keys()
-            results = [dict(zip(columns, row)) for row in rows]
+            # Remember generated SQL that executed successfully so repeat questions skip the model.
+            # The ungoverned SQL is stored, so every use is governed with its own row cap. SQL that
+            # came from the cache or a continuation token is already stored.
+            if not from_cache:
+                await run_in_threadpool(ai_service.sql_cache.remember, request.question, sql_query)
+            
+            if request.format in STREAM_MEDIA_TYPES:
+                return StreamingResponse(stream, media_type=STREAM_MEDIA_TYPES[request.format])
             
             return QueryResponse(
                 question=request.question,
-                sql_query=sql_query,
+                sql_query=governed_sql,
                 results=results,
-                success=True
+                success=True,
+                next_token=next_token
             )
             
         except Exception as db_error:
             logger.error(f"Database execution error: {str(db_error)}")
+            await run_in_threadpool(ai_service.sql_cache.forget, request.question)
             return QueryResponse(
                 question=request.question,
-                sql_query=sql_query,
+                sql_query=governed_sql,
                 results=[],
                 success=False,
                 error=f"Database error: {str(db_error)}"
             )
     
+    except HTTPException as e:
+        logger.error(f"Query processing error: {e.detail}")
+        return QueryResponse(
+            question=request.question,
+            sql_query="",
+            results=[],
+            success=False,
+            error=str(e.detail)
+        )
+    
     except Exception as e:
         logger.error(f"Query processing error: {str(e)}")
         return QueryResponse(
@@ -1,10 +1,32 @@
-import requests
+import asyncio
+import time
+import httpx
 import logging
+from typing import Dict, List, Optional, Tuple
 from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
 from ..config.settings import settings
+from ..utils.sql_cache import SQLCache, normalize_question
+from ..utils.metrics import MODEL_LATENCY, MODEL_ERRORS
+from .schema_service import schema_service
 
 logger = logging.getLogger(__name__)
 
+# Model responses worth retrying: the llama.cpp server is restarting or overloaded
+RETRY_STATUS_CODES = {502, 503, 504}
+
+# Identical on every request so the model server can reuse its cached prefix
+SYSTEM_PROMPT = (
+    "You are a SQL assistant for a healthcare provider database. "
+    "Generate only valid MySQL queries based on the schema provided. Focus on:\n"
+    "- Provider data quality analysis\n"
+    "- Duplicate detection and resolution\n"
+    "- Compliance reporting (license expiration, missing data)\n"
+    "- Provider demographics and distribution\n"
+    "- Data validation and integrity checks\n\n"
+    "Return only the SQL query without explanations, comments, or formatting."
+)
+
 
 class AIService:
     """Service for AI model interactions"""
@@ -12,68 +34,126 @@ class AIService:
     def __init__(self):
         self.model_url = settings.sql_model_url
         self.model_name = settings.sql_model_name
+        self._client: Optional[httpx.AsyncClient] = None
+        # Health probes get their own connection so a saturated pool never reads as an outage
+        self._probe_client: Optional[httpx.AsyncClient] = None
+        # Send only the tables and columns relevant to each question
+        self.prune_schema = settings.sql_prompt_prune_schema
+        self.cache_prompt = settings.sql_model_cache_prompt
+        # Model calls in flight, keyed by normalized question
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.model_calls = 0
+        self.coalesced_calls = 0
+        # Questions whose generated SQL has already executed successfully
+        self.sql_cache = SQLCache(settings.sql_cache_size, settings.sql_cache_path)
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Shared keep-alive client, created on first use inside the event loop"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.model_url,
+                timeout=httpx.Timeout(settings.sql_model_read_timeout, connect=settings.sql_model_connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=settings.sql_model_max_connections,
+                    max_keepalive_connections=settings.sql_model_max_connections
+                )
+            )
+        return self._client
+    
+    def _get_probe_client(self) -> httpx.AsyncClient:
+        """Single-connection client for health probes, outside the shared pool"""
+        if self._probe_client is None or self._probe_client.is_closed:
+            self._probe_client = httpx.AsyncClient(
+                base_url=self.model_url,
+                timeout=httpx.Timeout(settings.health_probe_timeout),
+                limits=httpx.Limits(max_connections=1, max_keepalive_connections=1)
+            )
+        return self._probe_client
+    
+    async def close(self) -> None:
+        """Close the shared and probe HTTP clients"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._probe_client is not None:
+            await self._probe_client.aclose()
+            self._probe_client = None
+    
+    async def _post_with_retries(self, path: str, payload: dict) -> httpx.Response:
+        """POST to the model, retrying connection failures and 502/503/504 with exponential backoff"""
+        retries = settings.sql_model_max_retries
+        for attempt in range(retries + 1):
+            try:
+                response = await self._get_client().post(path, json=payload)
+                if response.status_code not in RETRY_STATUS_CODES or attempt == retries:
+                    return response
+                logger.warning(f"AI model returned {response.status_code}, retrying ({attempt + 1}/{retries})")
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError) as e:
+                if attempt == retries:
+                    raise
+                logger.warning(f"AI model connection failed: {str(e)}, retrying ({attempt + 1}/{retries})")
+            await asyncio.sleep(settings.sql_model_retry_backoff * (2 ** attempt))
+    
+    async def build_messages(self, question: str) -> List[dict]:
+        """
+        Chat messages for a question. The system prompt is a constant so every request
+        shares a byte-identical prefix; only the schema subset and question vary.
+        """
+        schema_text = await run_in_threadpool(
+            schema_service.schema_text, question if self.prune_schema else None
+        )
+        prompt = (
+            f"Database Schema:\n\n{schema_text}\n\n"
+            f"Question: {question}\n\n"
+            "Generate a MySQL query to answer this question. Return only the SQL query."
+        )
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
     
-    def generate_sql_query(self, question: str) -> str:
-        """Generate SQL query using the AI model"""
+    async def generate_sql_query(self, question: str) -> Tuple[str, bool]:
+        """
+        Generate SQL query using the AI model. Returns the SQL and whether it came from
+        the SQL cache, so callers only remember freshly generated SQL.
+        """
+        cached_sql = self.sql_cache.lookup(question)
+        if cached_sql:
+            logger.info("Using cached SQL for question")
+            return cached_sql, True
+        
+        # Identical questions already being generated share the in-flight model call
+        key = normalize_question(question)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self.request_sql(question))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced_calls += 1
+            logger.info("Joining in-flight SQL generation for question")
+        # Shielded so one client disconnecting doesn't cancel the call for the others
+        return await asyncio.shield(task), False
+    
+    async def request_sql(self, question: str) -> str:
+        """Ask the model for SQL, bypassing the SQL cache"""
+        self.model_calls += 1
+        started = time.perf_counter()
         try:
-            # Prepare the prompt for SQLCoder with actual database schema
-            schema_context = """
-            Database Schema:
-            
-            Table: duplicates
-            Columns: i1 (BIGINT), i2 (BIGINT), provider_id_1 (TEXT), provider_id_2 (TEXT), 
-                    name_1 (TEXT), name_2 (TEXT), score (DOUBLE), name_score (DOUBLE), 
-                    npi_match (TINYINT(1)), addr_score (DOUBLE), phone_match (TINYINT(1)), 
-                    license_score (DOUBLE)
-            Description: Contains duplicate provider records with similarity scores
-            
-            Table: merged_roster
-            Columns: provider_id (TEXT), npi (BIGINT), first_name (TEXT), last_name (TEXT), 
-                    credential (TEXT), full_name (TEXT), primary_specialty (TEXT), 
-                    practice_address_line1 (TEXT), practice_address_line2 (TEXT), 
-                    practice_city (TEXT), practice_state (TEXT), practice_zip (TEXT), 
-                    practice_phone (TEXT), mailing_address_line1 (TEXT), 
-                    mailing_address_line2 (TEXT), mailing_city (TEXT), mailing_state (TEXT), 
-                    mailing_zip (TEXT), license_number (TEXT), license_state (TEXT), 
-                    license_expiration (TEXT), accepting_new_patients (TEXT), 
-                    board_certified (TINYINT(1)), years_in_practice (BIGINT), 
-                    medical_school (TEXT), residency_program (TEXT), last_updated (TEXT), 
-                    taxonomy_code (TEXT), status (TEXT), npi_present (TINYINT(1))
-            Description: Contains healthcare provider information and demographics
-            """
-            
-            system_prompt = """You are a SQL assistant for a healthcare provider database. Generate only valid MySQL queries based on the schema provided. Focus on:
-            - Provider data quality analysis
-            - Duplicate detection and resolution
-            - Compliance reporting (license expiration, missing data)
-            - Provider demographics and distribution
-            - Data validation and integrity checks
-            
-            Return only the SQL query without explanations, comments, or formatting."""
-            
-            prompt = f"""{schema_context}
-            
-            Question: {question}
-            
-            Generate a MySQL query to answer this question. Return only the SQL query.
-            """
+            messages = await self.build_messages(question)
             
             # Call the AI model
-            url = f"{self.model_url}/engines/llama.cpp/v1/chat/completions"
-            response = requests.post(
-                url,
-                headers={"Content-Type": "application/json"},
-                json={
+            response = await self._post_with_retries(
+                "/engines/llama.cpp/v1/chat/completions",
+                {
                     "model": self.model_name,
-                    "messages": [
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": prompt}
-                    ],
+                    "messages": messages,
                     "max_tokens": 500,
                     "temperature": 0.1,
-                    "stop": ["--", "/*", "Question:"]
-                },
-                timeout=30.0
+                    "stop": ["--", "/*", "Question:"],
+                    # Reuse the KV cache for the shared prompt prefix (llama.cpp server)
+                    "cache_prompt": self.cache_prompt
+                }
             )
             
             if response.status_code == 200:
@@ -90,19 +170,35 @@ class AIService:
                 return sql_query
             else:
                 logger.error(f"AI model error: {response.status_code} - {response.text}")
+                MODEL_ERRORS.inc(reason=f"http_{response.status_code}")
                 raise HTTPException(status_code=500, detail="Failed to generate SQL query")
                 
-        except requests.exceptions.Timeout:
+        except HTTPException:
+            raise
+        except httpx.TimeoutException:
             logger.error("AI model timeout")
+            MODEL_ERRORS.inc(reason="timeout")
             raise HTTPException(status_code=500, detail="AI model request timeout")
         except Exception as e:
             logger.error(f"Error calling AI model: {str(e)}")
+            MODEL_ERRORS.inc(reason=type(e).__name__)
             raise HTTPException(status_code=500, detail=f"AI model error: {str(e)}")
+        finally:
+            MODEL_LATENCY.observe(time.perf_counter() - started)
+    
+    def stats(self) -> dict:
+        """Model call counters and SQL cache statistics"""
+        return {
+            "model_calls": self.model_calls,
+            "coalesced_calls": self.coalesced_calls,
+            "in_flight": len(self._inflight),
+            "sql_cache": self.sql_cache.stats()
+        }
     
-    def check_health(self) -> str:
-        """Check AI model health"""
+    async def probe_health(self, timeout: float) -> str:
+        """Check AI model health over the probe client, so queued user requests don't delay it"""
         try:
-            response = requests.get(f"{self.model_url}/health", timeout=5.0)
+            response = await self._get_probe_client().get("/health", timeout=timeout)
             return "connected" if response.status_code == 200 else "error"
         except Exception:
             return "unavailable"
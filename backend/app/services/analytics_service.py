@@ -1,80 +1,174 @@
+import asyncio
 import logging
+from datetime import date
+from bisect import bisect_right
+from itertools import accumulate
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import inspect, text
 from fastapi import HTTPException
-from typing import Dict, List, Any
+from fastapi.concurrency import run_in_threadpool
+from typing import Dict, List, Any, Optional
+from ..config.database import engine
+from ..config.settings import settings
+from ..utils.cache import dataset_version
 
 logger = logging.getLogger(__name__)
 
+# Rollup tables rebuilt from merged_roster on every load (see AnalyticsService.refresh_rollups).
+# Each entry maps a table name to its column definitions and the aggregate that fills it,
+# with {roster} standing for the roster table; reads fall back to the aggregate itself while
+# a table does not exist yet.
+ROLLUP_TABLES = {
+    "rollup_specialty_years": (
+        """
+            primary_specialty VARCHAR(255),
+            years_in_practice BIGINT,
+            provider_count BIGINT
+        """,
+        """
+            SELECT 
+                primary_specialty,
+                years_in_practice,
+                COUNT(*) as provider_count
+            FROM {roster} 
+            WHERE primary_specialty IS NOT NULL 
+            AND years_in_practice IS NOT NULL 
+            AND years_in_practice >= 0 
+            AND years_in_practice <= 60
+            GROUP BY primary_specialty, years_in_practice
+        """
+    ),
+    "rollup_specialty_issues": (
+        """
+            primary_specialty VARCHAR(255),
+            provider_count BIGINT,
+            expired_licenses BIGINT,
+            missing_npi BIGINT,
+            phone_issues BIGINT,
+            address_issues BIGINT,
+            built_on DATE
+        """,
+        """
+            SELECT 
+                primary_specialty,
+                COUNT(*) as provider_count,
+                COUNT(CASE WHEN license_expiration < CURDATE() THEN 1 END) as expired_licenses,
+                COUNT(CASE WHEN npi IS NULL OR npi = 0 THEN 1 END) as missing_npi,
+                COUNT(CASE WHEN practice_phone IS NULL OR practice_phone = '' OR 
+                          LENGTH(TRIM(practice_phone)) < 10 THEN 1 END) as phone_issues,
+                COUNT(CASE WHEN practice_address_line1 IS NULL OR practice_address_line1 = '' THEN 1 END) as address_issues,
+                CURDATE() as built_on
+            FROM {roster} 
+            WHERE primary_specialty IS NOT NULL AND primary_specialty != ''
+            GROUP BY primary_specialty
+        """
+    ),
+    "rollup_state_counts": (
+        """
+            state VARCHAR(64),
+            provider_count BIGINT
+        """,
+        """
+            SELECT 
+                COALESCE(practice_state, license_state, 'Unknown') as state,
+                COUNT(*) as provider_count
+            FROM {roster} 
+            WHERE (practice_state IS NOT NULL AND practice_state != '') 
+               OR (license_state IS NOT NULL AND license_state != '')
+            GROUP BY COALESCE(practice_state, license_state, 'Unknown')
+        """
+    ),
+    "rollup_city_counts": (
+        """
+            city VARCHAR(255),
+            state VARCHAR(64),
+            provider_count BIGINT
+        """,
+        """
+            SELECT 
+                practice_city as city,
+                practice_state as state,
+                COUNT(*) as provider_count
+            FROM {roster} 
+            WHERE practice_city IS NOT NULL AND practice_city != ''
+            GROUP BY practice_city, practice_state
+        """
+    )
+}
+
 
 class AnalyticsService:
     """Service for analytics and reporting operations"""
     
+    # Number of points sent to the frontend per specialty box plot
+    SAMPLE_SIZE = 100
+    
+    def __init__(self):
+        self._ready_rollups = set()
+        self._task: Optional[asyncio.Task] = None
+    
+    def start(self) -> None:
+        """Start the rollup maintenance loop; call from inside the running event loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def _run(self) -> None:
+        while True:
+            try:
+                await run_in_threadpool(self.refresh_stale_rollups)
+            except Exception as e:
+                logger.warning(f"Rollup maintenance failed: {str(e)}")
+            await asyncio.sleep(settings.rollup_refresh_interval)
+    
     def get_specialty_experience_data(self, db: Session) -> Dict[str, Any]:
         """Get specialty experience data for box plot visualization"""
         try:
-            # Query to get experience distribution by specialty
-            query = text("""
-                SELECT 
-                    primary_specialty,
-                    years_in_practice,
-                    COUNT(*) as provider_count
-                FROM merged_roster 
-                WHERE primary_specialty IS NOT NULL 
-                AND years_in_practice IS NOT NULL 
-                AND years_in_practice >= 0 
-                AND years_in_practice <= 60
-                GROUP BY primary_specialty, years_in_practice
+            # Experience histogram by specialty, precomputed at ingest
+            query = text(f"""
+                SELECT primary_specialty, years_in_practice, provider_count
+                FROM {self._rollup_source(db, 'rollup_specialty_years')}
                 ORDER BY primary_specialty, years_in_practice
             """)
             
             result = db.execute(query)
             rows = result.fetchall()
             
-            # Group data by specialty
-            specialty_data = {}
+            # Group the (years, count) histogram by specialty
+            specialty_histograms = {}
             for row in rows:
                 specialty, years, count = row[0], row[1], row[2]
-                if specialty not in specialty_data:
-                    specialty_data[specialty] = []
-                
-                # Add individual years based on provider count
-                for _ in range(count):
-                    specialty_data[specialty].append(years)
+                years_list, counts_list = specialty_histograms.setdefault(specialty, ([], []))
+                years_list.append(years)
+                counts_list.append(count)
             
-            # Calculate statistics for each specialty
+            # Calculate statistics for each specialty directly from its histogram
             specialty_stats = []
-            for specialty, experience_data in specialty_data.items():
-                if len(experience_data) > 0:
-                    experience_data.sort()
-                    stats = {
-                        'specialty': specialty,
-                        'count': len(experience_data),
-                        'min': min(experience_data),
-                        'max': max(experience_data),
-                        'q1': experience_data[len(experience_data) // 4] if len(experience_data) >= 4 else min(experience_data),
-                        'median': experience_data[len(experience_data) // 2],
-                        'q3': experience_data[3 * len(experience_data) // 4] if len(experience_data) >= 4 else max(experience_data),
-                        'mean': sum(experience_data) / len(experience_data),
-                        'experience_data': experience_data[:100]  # Limit data points for frontend processing
-                    }
-                    specialty_stats.append(stats)
+            for specialty, (years_list, counts_list) in specialty_histograms.items():
+                stats = self._histogram_stats(years_list, counts_list)
+                if stats is not None:
+                    specialty_stats.append({'specialty': specialty, **stats})
             
             # Sort by provider count and take top 15
             specialty_stats.sort(key=lambda x: x['count'], reverse=True)
             top_specialties = specialty_stats[:15]
             
-            # Get overall statistics
-            all_experience_data = []
-            for specialty_info in top_specialties:
-                all_experience_data.extend(specialty_info['experience_data'])
-            
+            # Get overall statistics across the full histograms of the top specialties
+            overall_count = sum(info['count'] for info in top_specialties)
             overall_stats = {
-                'total_providers': len(all_experience_data),
+                'total_providers': overall_count,
                 'specialties_count': len(top_specialties),
-                'overall_mean': sum(all_experience_data) / len(all_experience_data) if all_experience_data else 0,
-                'overall_min': min(all_experience_data) if all_experience_data else 0,
-                'overall_max': max(all_experience_data) if all_experience_data else 0
+                'overall_mean': sum(info['mean'] * info['count'] for info in top_specialties) / overall_count if overall_count else 0,
+                'overall_min': min((info['min'] for info in top_specialties), default=0),
+                'overall_max': max((info['max'] for info in top_specialties), default=0)
             }
             
             return {
@@ -90,21 +184,13 @@ class AnalyticsService:
     def get_providers_by_specialty(self, db: Session) -> Dict[str, Any]:
         """Get provider categorization data by specialty for pie chart visualization"""
         try:
-            # Query to get provider count by specialty
-            query = text("""
+            # Provider and issue counts by specialty, precomputed at ingest
+            query = text(f"""
                 SELECT 
-                    primary_specialty,
-                    COUNT(*) as provider_count,
-                    COUNT(CASE WHEN license_expiration IS NOT NULL AND license_expiration != '' 
-                              AND STR_TO_DATE(license_expiration, '%Y-%m-%d') < CURDATE() THEN 1 END) as expired_licenses,
-                    COUNT(CASE WHEN npi IS NULL OR npi = 0 THEN 1 END) as missing_npi,
-                    COUNT(CASE WHEN practice_phone IS NULL OR practice_phone = '' OR 
-                              LENGTH(TRIM(practice_phone)) < 10 THEN 1 END) as phone_issues,
-                    COUNT(CASE WHEN practice_address_line1 IS NULL OR practice_address_line1 = '' THEN 1 END) as address_issues
-                FROM merged_roster 
-                WHERE primary_specialty IS NOT NULL AND primary_specialty != ''
-                GROUP BY primary_specialty
-                ORDER BY provider_count DESC
+                    primary_specialty, provider_count, expired_licenses,
+                    missing_npi, phone_issues, address_issues
+                FROM {self._rollup_source(db, 'rollup_specialty_issues')}
+                ORDER BY provider_count DESC, primary_specialty
                 LIMIT 20
             """)
             
@@ -166,17 +252,12 @@ class AnalyticsService:
     def get_providers_by_state(self, db: Session) -> Dict[str, Any]:
         """Get provider distribution data by state for bar chart visualization"""
         try:
-            # Query to get provider count by state from both practice and license states
-            query = text("""
-                SELECT 
-                    COALESCE(practice_state, license_state, 'Unknown') as state,
-                    COUNT(*) as provider_count
-                FROM merged_roster 
-                WHERE (practice_state IS NOT NULL AND practice_state != '') 
-                   OR (license_state IS NOT NULL AND license_state != '')
-                GROUP BY COALESCE(practice_state, license_state, 'Unknown')
-                HAVING provider_count > 0
-                ORDER BY provider_count DESC
+            # Provider count by state (practice state, falling back to license state), precomputed at ingest
+            query = text(f"""
+                SELECT state, provider_count
+                FROM {self._rollup_source(db, 'rollup_state_counts')}
+                WHERE provider_count > 0
+                ORDER BY provider_count DESC, state
                 LIMIT 15
             """)
             
@@ -225,6 +306,183 @@ class AnalyticsService:
         except Exception as e:
             logger.error(f"Error fetching providers by state data: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Error fetching providers by state data: {str(e)}")
+    
+    def get_providers_by_city(self, db: Session) -> Dict[str, Any]:
+        """Get provider distribution data by practice city for bar chart visualization"""
+        try:
+            # Provider count by city, precomputed at ingest
+            query = text(f"""
+                SELECT city, state, provider_count
+                FROM {self._rollup_source(db, 'rollup_city_counts')}
+                ORDER BY provider_count DESC, city
+                LIMIT 20
+            """)
+            
+            result = db.execute(query)
+            rows = result.fetchall()
+            
+            city_data = []
+            total_providers = 0
+            
+            for row in rows:
+                city_info = {
+                    'city': row[0],
+                    'state': row[1],
+                    'providers': row[2],
+                    'percentage': 0  # Will be calculated after we have total
+                }
+                
+                city_data.append(city_info)
+                total_providers += row[2]
+            
+            # Calculate percentages
+            for city in city_data:
+                city['percentage'] = round((city['providers'] / total_providers) * 100, 1) if total_providers > 0 else 0
+            
+            overall_stats = {
+                'total_providers': total_providers,
+                'total_cities': len(city_data),
+                'top_city': city_data[0]['city'] if city_data else None
+            }
+            
+            return {
+                'city_data': city_data,
+                'overall_stats': overall_stats,
+                'success': True
+            }
+            
+        except Exception as e:
+            logger.error(f"Error fetching providers by city data: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Error fetching providers by city data: {str(e)}")
+    
+    def get_license_expiration_calendar(self, db: Session, start: date, end: date) -> Dict[str, Any]:
+        """Get daily and monthly license expiration counts for calendar heatmap visualization"""
+        if start > end:
+            raise HTTPException(status_code=400, detail="start must be on or before end")
+        try:
+            # Range scan on the license_expiration index
+            query = text("""
+                SELECT license_expiration, COUNT(*) as provider_count
+                FROM merged_roster
+                WHERE license_expiration BETWEEN :start AND :end
+                GROUP BY license_expiration
+                ORDER BY license_expiration
+            """)
+            
+            result = db.execute(query, {"start": start, "end": end})
+            rows = result.fetchall()
+            
+            daily_data = []
+            monthly_counts: Dict[str, int] = {}
+            for row in rows:
+                day = row[0] if isinstance(row[0], date) else date.fromisoformat(str(row[0])[:10])
+                daily_data.append({'date': day.isoformat(), 'count': row[1]})
+                month = day.strftime('%Y-%m')
+                monthly_counts[month] = monthly_counts.get(month, 0) + row[1]
+            
+            monthly_data = [{'month': month, 'count': count} for month, count in monthly_counts.items()]
+            total_expirations = sum(item['count'] for item in daily_data)
+            
+            overall_stats = {
+                'start': start.isoformat(),
+                'end': end.isoformat(),
+                'total_expirations': total_expirations,
+                'days_with_expirations': len(daily_data),
+                'peak_day': max(daily_data, key=lambda item: item['count'])['date'] if daily_data else None,
+                'peak_month': max(monthly_data, key=lambda item: item['count'])['month'] if monthly_data else None
+            }
+            
+            return {
+                'daily_data': daily_data,
+                'monthly_data': monthly_data,
+                'overall_stats': overall_stats,
+                'success': True
+            }
+            
+        except Exception as e:
+            logger.error(f"Error fetching license expiration calendar data: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Error fetching license expiration calendar data: {str(e)}")
+    
+    def ensure_rollups(self, connection) -> None:
+        """
+        Create missing rollup tables and fill them from merged_roster if it exists, so a
+        database loaded before the rollups existed serves analytics without a reload.
+        Must not run inside a load: CREATE TABLE commits implicitly on MySQL.
+        """
+        inspector = inspect(connection)
+        missing = [name for name in ROLLUP_TABLES if not inspector.has_table(name)]
+        for name in missing:
+            columns, _ = ROLLUP_TABLES[name]
+            connection.execute(text(f"CREATE TABLE IF NOT EXISTS {name} ({columns})"))
+        if missing and inspector.has_table("merged_roster"):
+            self.refresh_rollups(connection, missing)
+        self._ready_rollups.update(ROLLUP_TABLES)
+    
+    def refresh_rollups(self, connection, tables: Optional[List[str]] = None, roster: str = "merged_roster") -> None:
+        """
+        Rebuild rollup tables from the roster table on the caller's connection.
+        Uses DELETE + INSERT ... SELECT so the refresh commits together with the load;
+        a load writing to a staging copy of merged_roster passes its name as roster.
+        """
+        for name in tables or ROLLUP_TABLES:
+            _, select = ROLLUP_TABLES[name]
+            connection.execute(text(f"DELETE FROM {name}"))
+            connection.execute(text(f"INSERT INTO {name} {select.format(roster=roster)}"))
+        logger.info(f"Refreshed rollup tables: {', '.join(tables or ROLLUP_TABLES)}")
+    
+    def refresh_stale_rollups(self) -> None:
+        """
+        Rebuild rollup_specialty_issues once the day it was built has passed, since its
+        expired license counts depend on today's date. Runs in the maintenance loop.
+        """
+        with engine.begin() as connection:
+            if not inspect(connection).has_table("rollup_specialty_issues"):
+                return
+            stale = connection.execute(text(
+                "SELECT COUNT(*) FROM rollup_specialty_issues WHERE built_on < CURDATE()"
+            )).scalar()
+            if not stale:
+                return
+            self.refresh_rollups(connection, ["rollup_specialty_issues"])
+        # Cached analytics responses still hold yesterday's counts
+        dataset_version.bump()
+    
+    def _rollup_source(self, db: Session, name: str) -> str:
+        """The rollup table, or its aggregate over merged_roster while the table doesn't exist"""
+        if name not in self._ready_rollups:
+            if not inspect(db.connection()).has_table(name):
+                _, select = ROLLUP_TABLES[name]
+                return f"({select.format(roster='merged_roster')}) AS {name}"
+            self._ready_rollups.add(name)
+        return name
+    
+    def _histogram_stats(self, values: List[int], counts: List[int]) -> Optional[Dict[str, Any]]:
+        """
+        Box plot statistics from a sorted (value, count) histogram.
+        Quartiles use the same rank positions as indexing the expanded sorted list,
+        and the sample is drawn at evenly spaced ranks across the distribution.
+        """
+        cumulative = list(accumulate(counts))
+        total = cumulative[-1] if cumulative else 0
+        if total <= 0:
+            return None
+        
+        def value_at(rank: int) -> int:
+            return values[bisect_right(cumulative, rank)]
+        
+        sample_size = min(total, self.SAMPLE_SIZE)
+        step = (total - 1) / (sample_size - 1) if sample_size > 1 else 0
+        
+        return {
+            'count': total,
+            'min': values[0],
+            'max': values[-1],
+            'q1': value_at(total // 4) if total >= 4 else values[0],
+            'median': value_at(total // 2),
+            'q3': value_at(3 * total // 4) if total >= 4 else values[-1],
+            'mean': sum(v * c for v, c in zip(values, counts)) / total,
+            'experience_data': [value_at(round(i * step)) for i in range(sample_size)]
+        }
 
 
 # Global analytics service instance
@@ -1,78 +1,225 @@
-import pandas as pd
 import io
+import json
+import base64
 import os
 import sys
+import time
 import logging
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import text, bindparam, inspect, Date, String
 from fastapi import HTTPException, UploadFile
-from typing import List, Tuple, Dict, Any
+from typing import List, Tuple, Dict, Any, Optional
 from ..models.schemas import Provider, Duplicate, ClusterInfo
+from ..config.database import engine
 from ..config.settings import settings
-
-# Add the parent directory to the path to import pipeline
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-from pipeline import preprocessing
+from .analytics_service import analytics_service
+from ..utils.cache import dataset_version
+from ..utils.metrics import PIPELINE_DURATION
 
 logger = logging.getLogger(__name__)
 
+# Tables emptied and refilled on every load, mapped to their column and index definitions.
+# They are created once by DataService.ensure_tables: MySQL commits implicitly on
+# CREATE TABLE and CREATE INDEX, so no DDL may run inside the load transaction.
+LOAD_TABLES = {
+    "clusters": """
+        cluster_id VARCHAR(64),
+        member_index BIGINT,
+        is_representative BOOLEAN,
+        provider_id VARCHAR(64),
+        npi BIGINT,
+        full_name TEXT,
+        primary_specialty TEXT,
+        license_number TEXT,
+        license_state TEXT,
+        INDEX idx_clusters_cluster_id (cluster_id),
+        INDEX idx_clusters_member_index (member_index)
+    """,
+    "cluster_summary": """
+        cluster_id VARCHAR(64),
+        cluster_size BIGINT,
+        pair_count BIGINT,
+        max_score DOUBLE,
+        min_score DOUBLE,
+        npi_match BOOLEAN,
+        phone_match BOOLEAN,
+        state VARCHAR(16),
+        INDEX idx_cluster_summary_page (max_score, cluster_id),
+        INDEX idx_cluster_summary_size (cluster_size),
+        INDEX idx_cluster_summary_state (state, max_score)
+    """
+}
+
+
+def _load_pipeline():
+    """
+    Import the pipeline module (and with it pandas, NumPy and multiprocessing) on first use,
+    so workers that never process a roster don't pay for it at startup.
+    """
+    backend_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+    if backend_dir not in sys.path:
+        sys.path.append(backend_dir)
+    import pipeline
+    return pipeline
+
 
 class DataService:
     """Service for data processing and database operations"""
     
+    def __init__(self):
+        self._tables_ready = False
+    
+    def ensure_tables(self) -> None:
+        """
+        Create the tables each load refills and the analytics rollups, if they don't exist yet.
+        Runs at startup and before every load, on its own connection so its DDL never
+        commits a load halfway.
+        """
+        if self._tables_ready:
+            return
+        with engine.begin() as connection:
+            for name, columns in LOAD_TABLES.items():
+                connection.execute(text(f"CREATE TABLE IF NOT EXISTS {name} ({columns})"))
+            analytics_service.ensure_rollups(connection)
+        self._tables_ready = True
+    
+    def resolve_data_path(self) -> str:
+        """Directory holding the reference CSVs used by merge_roster"""
+        # Use data/ as base path for merge_roster
+        base_path = settings.data_path
+        
+        # If environment variable not set, try relative path
+        if base_path == "/app/data" and not os.path.exists(base_path):
+            current_dir = os.path.dirname(os.path.abspath(__file__))
+            base_path = os.path.join(current_dir, "..", "..", "data")
+            base_path = os.path.abspath(base_path)
+        
+        # Ensure directory exists
+        os.makedirs(base_path, exist_ok=True)
+        return base_path
+    
+    def load_reference_data(self) -> None:
+        """Parse the reference CSVs ahead of the first roster upload"""
+        _load_pipeline().load_reference_data(self.resolve_data_path())
+    
     async def process_csv_file(self, file: UploadFile, db: Session) -> Dict[str, Any]:
         """Process uploaded CSV file using preprocessing function"""
         try:
+            started = time.perf_counter()
+            import pandas as pd
+            pipeline = _load_pipeline()
+            
             # Read uploaded file into pandas DataFrame
             contents = await file.read()
+            file_format = pipeline.table_format(file.filename or "")
             
-            try:
-                df = pd.read_csv(io.BytesIO(contents))
-                logger.info("File read successfully using BytesIO")
-            except Exception:
-                # fallback if file contents are text or encoding causes BytesIO read issues
-                df = pd.read_csv(io.StringIO(contents.decode()))
-                logger.info("File read successfully using StringIO")
-            
-            # Use data/ as base path for merge_roster
-            base_path = settings.data_path
-            
-            # If environment variable not set, try relative path
-            if base_path == "/app/data" and not os.path.exists(base_path):
-                current_dir = os.path.dirname(os.path.abspath(__file__))
-                base_path = os.path.join(current_dir, "..", "..", "data")
-                base_path = os.path.abspath(base_path)
-            
-            # Ensure directory exists
-            os.makedirs(base_path, exist_ok=True)
+            if file_format != "csv":
+                # Parquet / Arrow IPC uploads load without text parsing
+                df = pipeline.read_table(contents, file_format)
+                logger.info(f"File read successfully as {file_format}")
+            else:
+                try:
+                    df = pd.read_csv(io.BytesIO(contents))
+                    logger.info("File read successfully using BytesIO")
+                except Exception:
+                    # fallback if file contents are text or encoding causes BytesIO read issues
+                    df = pd.read_csv(io.StringIO(contents.decode()))
+                    logger.info("File read successfully using StringIO")
             
+            base_path = self.resolve_data_path()
             logger.info(f"Base path resolved to: {base_path}")
             logger.info(f"Base path exists: {os.path.exists(base_path)}")
             
-            dup_df, clusters, summary, merged_df = preprocessing(df, base_path)
+            stage_started = time.perf_counter()
+            PIPELINE_DURATION.observe(stage_started - started, stage="read")
+            dup_df, clusters, summary, merged_df = pipeline.preprocessing(df, base_path)
+            clusters_df = pipeline.build_cluster_table(clusters, df)
+            cluster_summary_df = pipeline.build_cluster_summary(clusters, dup_df, df)
+            PIPELINE_DURATION.observe(time.perf_counter() - stage_started, stage="preprocessing")
+            stage_started = time.perf_counter()
 
             # Save tables to database using the session
             try:
-                # Save duplicates
-                if not dup_df.empty:
-                    dup_df.to_sql("duplicates", con=db.bind, if_exists="replace", index=False)
+                self.ensure_tables()
+                
+                # The roster positions i1/i2 shift whenever earlier rows change, so duplicates are
+                # stored without them and tied to clusters by provider id
+                deltas = {
+                    "duplicates": (
+                        None if dup_df.empty else dup_df.drop(columns=["i1", "i2"]), ["provider_id_1", "provider_id_2"],
+                        {"provider_id_1": String(64), "provider_id_2": String(64)},
+                        {"idx_duplicates_pair": "provider_id_1, provider_id_2"}
+                    ),
+                    "merged_roster": (
+                        None if merged_df.empty else merged_df, ["provider_id"],
+                        {"provider_id": String(64), **{col: Date() for col in pipeline.DATE_COLUMNS if col in merged_df.columns}},
+                        {
+                            "idx_merged_roster_provider_id": "provider_id",
+                            "idx_merged_roster_license_expiration": "license_expiration"
+                        }
+                    )
+                }
+                
+                # Create or reshape the tables before the load transaction starts (see _prepare_table)
+                frames, targets = {}, {}
+                for table, (df_out, keys, dtype, indexes) in deltas.items():
+                    if df_out is not None:
+                        frames[table] = df_out.assign(row_hash=pipeline.content_hash(df_out))
+                        targets[table] = self._prepare_table(frames[table], table, dtype, indexes)
                 
-                # Save merged_df
-                if not merged_df.empty:
-                    merged_df.to_sql("merged_roster", con=db.bind, if_exists="replace", index=False)
+                connection = db.connection()
+                
+                # Write only the duplicates and merged roster rows that changed since the last load;
+                # a load without duplicates (or roster rows) empties the stored ones
+                writes = {}
+                for table, (_, keys, _, _) in deltas.items():
+                    if table in frames:
+                        writes[table] = self._write_delta(connection, frames[table], table, targets[table], keys)
+                    else:
+                        writes[table] = self._clear_table(connection, table)
+                logger.info(f"Database writes: {writes}")
+                
+                # Save cluster assignments (always replaced so stale clusters never outlive a load)
+                connection.execute(text("DELETE FROM clusters"))
+                clusters_df.to_sql("clusters", con=connection, if_exists="append", index=False)
+                
+                # Save per-cluster summary used to filter and page the duplicates API
+                connection.execute(text("DELETE FROM cluster_summary"))
+                cluster_summary_df.to_sql("cluster_summary", con=connection, if_exists="append", index=False)
+                
+                # Rebuild analytics rollups from the new roster in the same transaction,
+                # unless the roster itself did not change
+                if writes["merged_roster"]["changed"]:
+                    analytics_service.refresh_rollups(connection, roster=targets.get("merged_roster", "merged_roster"))
                 
                 # Commit the transaction
                 db.commit()
                 
+                try:
+                    # Put tables loaded into staging copies in place of the live ones
+                    for table, target in targets.items():
+                        if target != table:
+                            self._swap_in(table, target)
+                finally:
+                    # Invalidate cached read responses for the previous dataset
+                    dataset_version.bump()
+                PIPELINE_DURATION.observe(time.perf_counter() - stage_started, stage="write")
+                
             except Exception as db_error:
                 db.rollback()
                 logger.error(f"Database save error: {str(db_error)}")
                 raise HTTPException(status_code=500, detail=f"Database save error: {str(db_error)}")
                 
+            if settings.parquet_export_dir:
+                self._export_parquet(pipeline, dup_df, merged_df)
+            
+            PIPELINE_DURATION.observe(time.perf_counter() - started, stage="total")
+            
             # Convert results to JSON serializable
             result = {
                 "clusters": clusters,
                 "summary": summary,
+                "writes": writes
             }
             return result
             
@@ -80,6 +227,15 @@ class DataService:
             logger.error(f"Error processing CSV: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Error processing CSV: {str(e)}")
     
+    def _export_parquet(self, pipeline, dup_df, merged_df) -> None:
+        """Write the latest duplicates and merged roster as Parquet; failures don't fail the upload"""
+        try:
+            os.makedirs(settings.parquet_export_dir, exist_ok=True)
+            pipeline.write_table(dup_df, os.path.join(settings.parquet_export_dir, "duplicates.parquet"))
+            pipeline.write_table(merged_df, os.path.join(settings.parquet_export_dir, "merged_roster.parquet"))
+        except Exception as e:
+            logger.warning(f"Parquet export failed: {str(e)}")
+    
     def get_providers_paginated(self, db: Session, page: int = 1, limit: int = 20) -> Tuple[List[Provider], int, int]:
         """Get paginated list of providers"""
         try:
@@ -130,110 +286,276 @@ class DataService:
             logger.error(f"Error fetching providers: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Error fetching providers: {str(e)}")
     
-    def get_duplicate_clusters(self, db: Session) -> Tuple[List[ClusterInfo], int, int]:
-        """Get duplicate clusters with provider information"""
+    def get_duplicate_clusters(
+        self,
+        db: Session,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        min_score: Optional[float] = None,
+        max_score: Optional[float] = None,
+        npi_match: Optional[bool] = None,
+        phone_match: Optional[bool] = None,
+        min_size: Optional[int] = None,
+        max_size: Optional[int] = None,
+        state: Optional[str] = None
+    ) -> Tuple[List[ClusterInfo], int, int, Optional[str]]:
+        """Get a page of duplicate clusters with provider information"""
         try:
-            # Get all duplicates from the database
-            duplicates_query = text("""
-                SELECT 
-                    i1, i2, provider_id_1, provider_id_2, name_1, name_2,
-                    score, name_score, npi_match, addr_score, phone_match, license_score
-                FROM duplicates
-                ORDER BY score DESC
+            # No clusters until the tables are created, at startup or by the first load
+            if not self._tables_ready and not self._tables_exist(db, ["cluster_summary", "clusters"]):
+                logger.warning("Duplicate cluster tables do not exist yet")
+                return [], 0, 0, None
+            
+            # Filters apply to the per-cluster summary written by the pipeline
+            conditions = []
+            params: Dict[str, Any] = {}
+            if min_score is not None:
+                conditions.append("max_score >= :min_score")
+                params["min_score"] = min_score
+            if max_score is not None:
+                conditions.append("max_score <= :max_score")
+                params["max_score"] = max_score
+            if npi_match is not None:
+                conditions.append("npi_match = :npi_match")
+                params["npi_match"] = npi_match
+            if phone_match is not None:
+                conditions.append("phone_match = :phone_match")
+                params["phone_match"] = phone_match
+            if min_size is not None:
+                conditions.append("cluster_size >= :min_size")
+                params["min_size"] = min_size
+            if max_size is not None:
+                conditions.append("cluster_size <= :max_size")
+                params["max_size"] = max_size
+            if state:
+                conditions.append("state = :state")
+                params["state"] = state.upper()
+            where_clause = " AND ".join(conditions) if conditions else "1 = 1"
+            
+            # Totals come from the small summary table, not from the pair rows
+            count_query = text(f"""
+                SELECT COUNT(*), COALESCE(SUM(pair_count), 0)
+                FROM cluster_summary
+                WHERE {where_clause}
             """)
+            count_row = db.execute(count_query, params).fetchone()
+            total_clusters, total_duplicates = int(count_row[0]), int(count_row[1])
             
-            duplicates_result = db.execute(duplicates_query)
-            duplicates_rows = duplicates_result.fetchall()
+            # Keyset pagination: best-scoring clusters first, cluster_id breaks ties
+            page_conditions = list(conditions)
+            page_params = dict(params, limit=limit + 1)
+            if cursor:
+                cursor_score, cursor_id = self._decode_cursor(cursor)
+                page_conditions.append(
+                    "(max_score < :cursor_score OR (max_score = :cursor_score AND cluster_id > :cursor_id))"
+                )
+                page_params.update(cursor_score=cursor_score, cursor_id=cursor_id)
+            page_where = " AND ".join(page_conditions) if page_conditions else "1 = 1"
+            page_query = text(f"""
+                SELECT cluster_id, max_score
+                FROM cluster_summary
+                WHERE {page_where}
+                ORDER BY max_score DESC, cluster_id
+                LIMIT :limit
+            """)
+            page_rows = db.execute(page_query, page_params).fetchall()
             
-            # Build clusters from duplicates
-            clusters_map = {}
-            processed_pairs = set()
+            next_cursor = None
+            if len(page_rows) > limit:
+                page_rows = page_rows[:limit]
+                next_cursor = self._encode_cursor(page_rows[-1][1], page_rows[-1][0])
             
-            for row in duplicates_rows:
-                i1, i2 = row[0], row[1]
-                if (i1, i2) in processed_pairs or (i2, i1) in processed_pairs:
-                    continue
-                    
-                processed_pairs.add((i1, i2))
-                
-                # Find existing cluster or create new one
-                cluster_id = None
-                for cid, cluster_data in clusters_map.items():
-                    if i1 in cluster_data['members'] or i2 in cluster_data['members']:
-                        cluster_id = cid
-                        break
-                
-                if cluster_id is None:
-                    cluster_id = f"cluster_{min(i1, i2)}"
-                    clusters_map[cluster_id] = {
-                        'members': set(),
-                        'representative': min(i1, i2),
-                        'duplicates': []
-                    }
-                
-                clusters_map[cluster_id]['members'].add(i1)
-                clusters_map[cluster_id]['members'].add(i2)
-                
-                duplicate = Duplicate(
-                    i1=row[0], i2=row[1], provider_id_1=row[2], provider_id_2=row[3],
-                    name_1=row[4], name_2=row[5], score=row[6], name_score=row[7],
-                    npi_match=bool(row[8]) if row[8] is not None else None,
-                    addr_score=row[9], phone_match=bool(row[10]) if row[10] is not None else None,
-                    license_score=row[11]
+            cluster_ids = [row[0] for row in page_rows]
+            if not cluster_ids:
+                return [], total_clusters, total_duplicates, None
+            
+            clusters_map = {
+                cluster_id: {'members': [], 'representative': None, 'providers': [], 'duplicates': []}
+                for cluster_id in cluster_ids
+            }
+            
+            members_query = text("""
+                SELECT 
+                    cluster_id, member_index, is_representative,
+                    provider_id, npi, full_name, primary_specialty, license_number, license_state
+                FROM clusters
+                WHERE cluster_id IN :cluster_ids
+                ORDER BY cluster_id, member_index
+            """).bindparams(bindparam("cluster_ids", expanding=True))
+            
+            for row in db.execute(members_query, {"cluster_ids": cluster_ids}).fetchall():
+                cluster_data = clusters_map[row[0]]
+                cluster_data['members'].append(row[1])
+                if row[2]:
+                    cluster_data['representative'] = row[1]
+                cluster_data['providers'].append(Provider(
+                    provider_id=row[3],
+                    npi=row[4],
+                    full_name=row[5],
+                    primary_specialty=row[6],
+                    license_number=row[7],
+                    license_state=row[8]
+                ))
+            
+            # Attach each duplicate pair to the cluster holding both its providers,
+            # taking i1/i2 from their positions in the current roster
+            duplicates_query = text("""
+                SELECT 
+                    c.cluster_id,
+                    c.member_index, c2.member_index, d.provider_id_1, d.provider_id_2, d.name_1, d.name_2,
+                    d.score, d.name_score, d.npi_match, d.addr_score, d.phone_match, d.license_score
+                FROM clusters c
+                JOIN duplicates d ON d.provider_id_1 = c.provider_id
+                JOIN clusters c2 ON c2.cluster_id = c.cluster_id AND c2.provider_id = d.provider_id_2
+                WHERE c.cluster_id IN :cluster_ids
+                ORDER BY d.score DESC
+            """).bindparams(bindparam("cluster_ids", expanding=True))
+            
+            for row in db.execute(duplicates_query, {"cluster_ids": cluster_ids}).fetchall():
+                clusters_map[row[0]]['duplicates'].append(self._row_to_duplicate(row[1:]))
+            
+            cluster_infos = [
+                ClusterInfo(
+                    cluster_id=cluster_id,
+                    members=cluster_data['members'],
+                    representative=cluster_data['representative'],
+                    providers=cluster_data['providers'],
+                    duplicates=cluster_data['duplicates']
                 )
-                clusters_map[cluster_id]['duplicates'].append(duplicate)
+                for cluster_id, cluster_data in clusters_map.items()
+            ]
             
-            # Get provider details for each cluster
-            cluster_infos = []
-            for cluster_id, cluster_data in clusters_map.items():
-                member_ids = list(cluster_data['members'])
-                
-                # Get provider details for cluster members
-                if member_ids:
-                    cluster_providers = []
-                    
-                    for member_id in member_ids:
-                        provider_query = text("""
-                            SELECT 
-                                provider_id, npi, full_name, primary_specialty, license_number, license_state
-                            FROM merged_roster 
-                            ORDER BY provider_id
-                            LIMIT 1 OFFSET :offset
-                        """)
-                        
-                        try:
-                            provider_result = db.execute(provider_query, {"offset": member_id})
-                            provider_row = provider_result.fetchone()
-                            
-                            if provider_row:
-                                provider = Provider(
-                                    provider_id=provider_row[0],
-                                    npi=provider_row[1], 
-                                    full_name=provider_row[2],
-                                    primary_specialty=provider_row[3], 
-                                    license_number=provider_row[4], 
-                                    license_state=provider_row[5]
-                                )
-                                cluster_providers.append(provider)
-                        except Exception as e:
-                            logger.warning(f"Could not fetch provider at index {member_id}: {str(e)}")
-                            continue
-                    
-                    if cluster_providers:  # Only create cluster if we found providers
-                        cluster_info = ClusterInfo(
-                            cluster_id=cluster_id,
-                            members=member_ids,
-                            representative=cluster_data['representative'],
-                            providers=cluster_providers,
-                            duplicates=cluster_data['duplicates']
-                        )
-                        cluster_infos.append(cluster_info)
-            
-            return cluster_infos, len(cluster_infos), len(duplicates_rows)
+            return cluster_infos, total_clusters, total_duplicates, next_cursor
             
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Error fetching duplicates: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Error fetching duplicates: {str(e)}")
+    
+    @staticmethod
+    def _tables_exist(db: Session, tables: List[str]) -> bool:
+        inspector = inspect(db.connection())
+        return all(inspector.has_table(table) for table in tables)
+    
+    @staticmethod
+    def _encode_cursor(max_score: float, cluster_id: str) -> str:
+        """Encode the last cluster of a page as an opaque cursor"""
+        payload = json.dumps([max_score, cluster_id]).encode()
+        return base64.urlsafe_b64encode(payload).decode()
+    
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[float, str]:
+        """Decode a cursor produced by _encode_cursor"""
+        try:
+            max_score, cluster_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return float(max_score), str(cluster_id)
+        except Exception:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    @staticmethod
+    def _row_to_duplicate(row) -> Duplicate:
+        """Convert a duplicates row (i1, i2, provider_id_1 .. license_score) to a Duplicate"""
+        return Duplicate(
+            i1=row[0], i2=row[1], provider_id_1=row[2], provider_id_2=row[3],
+            name_1=row[4], name_2=row[5], score=row[6], name_score=row[7],
+            npi_match=bool(row[8]) if row[8] is not None else None,
+            addr_score=row[9], phone_match=bool(row[10]) if row[10] is not None else None,
+            license_score=row[11]
+        )
+    
+    def _prepare_table(self, df, table: str, dtype: Dict, indexes: Dict[str, str]) -> str:
+        """
+        Make sure a table with df's columns exists before the load transaction starts and
+        return the table the load should write to. MySQL commits implicitly on DDL, so this
+        runs on its own connection: a missing table is created empty, and when the columns
+        changed an empty {table}_staging copy is built instead, which _swap_in puts in place
+        once the load commits.
+        """
+        with engine.begin() as connection:
+            inspector = inspect(connection)
+            if not inspector.has_table(table):
+                target = table
+            elif [column["name"] for column in inspector.get_columns(table)] == list(df.columns):
+                return table
+            else:
+                target = f"{table}_staging"
+            df.head(0).to_sql(target, con=connection, if_exists="replace", index=False, dtype=dtype)
+            for name, columns in indexes.items():
+                self._create_index(connection, target, name, columns)
+        return target
+    
+    @staticmethod
+    def _swap_in(table: str, staging: str) -> None:
+        """Replace a table with its loaded staging copy; RENAME TABLE swaps both names at once"""
+        with engine.begin() as connection:
+            connection.execute(text(f"DROP TABLE IF EXISTS {table}_old"))
+            connection.execute(text(f"RENAME TABLE {table} TO {table}_old, {staging} TO {table}"))
+            connection.execute(text(f"DROP TABLE {table}_old"))
+    
+    @staticmethod
+    def _clear_table(connection, table: str) -> Dict[str, Any]:
+        """Delete every stored row of a table the current load has nothing for"""
+        if not inspect(connection).has_table(table):
+            return {"mode": "clear", "rows": 0, "changed": 0}
+        deleted = connection.execute(text(f"DELETE FROM {table}")).rowcount
+        return {"mode": "clear", "rows": 0, "changed": deleted}
+    
+    def _write_delta(self, connection, df, table: str, target: str, keys: List[str]) -> Dict[str, Any]:
+        """
+        Bring target (table, or its staging copy from _prepare_table) in line with df by
+        inserting, updating and deleting only the rows that changed. Rows are matched on
+        `keys` and compared by df's row_hash column. All rows are rewritten instead, with
+        DELETE and INSERT, for a staging copy, when keys are missing or repeated, or with
+        DELTA_WRITES off. Runs no DDL, so it commits or rolls back with the load.
+        """
+        batch = settings.delta_write_batch_size
+        if target != table or not settings.delta_writes or df[keys].isna().any().any() or df.duplicated(keys).any():
+            connection.execute(text(f"DELETE FROM {target}"))
+            df.to_sql(target, con=connection, if_exists="append", index=False, chunksize=batch)
+            return {"mode": "replace", "rows": len(df), "changed": len(df)}
+        
+        import pandas as pd
+        stored = pd.read_sql(text(f"SELECT {', '.join(keys)}, row_hash FROM {table}"), connection)
+        stored_hash = stored.set_index(keys)["row_hash"]
+        new_hash = df.set_index(keys)["row_hash"]
+        
+        exists = new_hash.index.isin(stored_hash.index)
+        inserted = df[~exists]
+        updated = df[exists & (new_hash.to_numpy() != stored_hash.reindex(new_hash.index).to_numpy())]
+        deleted = stored_hash.index[~stored_hash.index.isin(new_hash.index)].to_frame(index=False)
+        
+        match = " AND ".join(f"{key} = :{key}" for key in keys)
+        if not deleted.empty:
+            self._execute_batches(connection, f"DELETE FROM {table} WHERE {match}", deleted, batch)
+        if not updated.empty:
+            assignments = ", ".join(f"{col} = :{col}" for col in df.columns if col not in keys)
+            self._execute_batches(connection, f"UPDATE {table} SET {assignments} WHERE {match}", updated, batch)
+        if not inserted.empty:
+            inserted.to_sql(table, con=connection, if_exists="append", index=False, chunksize=batch)
+        
+        return {
+            "mode": "delta", "rows": len(df), "changed": len(inserted) + len(updated) + len(deleted),
+            "inserted": len(inserted), "updated": len(updated), "deleted": len(deleted)
+        }
+    
+    @staticmethod
+    def _execute_batches(connection, sql: str, df, batch: int) -> None:
+        """Run a statement once per DataFrame row, sending `batch` rows per executemany"""
+        params = df.astype(object).where(df.notna(), None).to_dict("records")
+        date_columns = df.select_dtypes(include="datetime").columns
+        for row in params:
+            for column in date_columns:
+                if row[column] is not None:
+                    row[column] = row[column].to_pydatetime()
+        statement = text(sql)
+        for start in range(0, len(params), batch):
+            connection.execute(statement, params[start:start + batch])
+    
+    @staticmethod
+    def _create_index(connection, table: str, name: str, columns: str) -> None:
+        """Create an index on a table that was just created by to_sql"""
+        connection.execute(text(f"CREATE INDEX {name} ON {table} ({columns})"))
 
 
 # Global data service instance
@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+
+from ..config.database import engine
+from ..config.settings import settings
+from .ai_service import ai_service
+
+logger = logging.getLogger(__name__)
+
+
+class HealthService:
+    """
+    Probes the database and the AI model on an interval in a background task and
+    keeps the latest status and latency of each, so health checks never block on them.
+    """
+
+    def __init__(self):
+        self.database = {"status": "unknown", "latency_ms": None}
+        self.ai_model = {"status": "unknown", "latency_ms": None}
+        self.checked_at: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start the probe loop; call from inside the running event loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.probe()
+            except Exception as e:
+                logger.error(f"Health probe failed: {str(e)}")
+            await asyncio.sleep(settings.health_probe_interval)
+
+    async def probe(self) -> None:
+        """Probe both dependencies concurrently and store the results"""
+        previous = (self.database["status"], self.ai_model["status"])
+        self.database, self.ai_model = await asyncio.gather(
+            self._timed(run_in_threadpool(self._check_database)),
+            self._timed(ai_service.probe_health(settings.health_probe_timeout))
+        )
+        self.checked_at = datetime.utcnow()
+        if (self.database["status"], self.ai_model["status"]) != previous:
+            logger.info(f"Health changed: database={self.database['status']}, ai_model={self.ai_model['status']}")
+
+    async def _timed(self, check) -> dict:
+        started = time.perf_counter()
+        try:
+            status = await asyncio.wait_for(check, timeout=settings.health_probe_timeout)
+        except asyncio.TimeoutError:
+            status = "error: probe timed out"
+        except Exception as e:
+            status = f"error: {str(e)}"
+        return {"status": status, "latency_ms": round((time.perf_counter() - started) * 1000, 1)}
+
+    @staticmethod
+    def _check_database() -> str:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        return "connected"
+
+    def status(self) -> dict:
+        """Latest probe results, without touching either dependency"""
+        if self.checked_at is None:
+            overall = "starting"
+        elif self.database["status"] == "connected" and self.ai_model["status"] == "connected":
+            overall = "healthy"
+        else:
+            overall = "degraded"
+        return {
+            "status": overall,
+            "database": self.database["status"],
+            "ai_model": self.ai_model["status"],
+            "database_latency_ms": self.database["latency_ms"],
+            "ai_model_latency_ms": self.ai_model["latency_ms"],
+            "checked_at": self.checked_at
+        }
+
+
+# Global health service instance
+health_service = HealthService()
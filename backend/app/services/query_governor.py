@@ -0,0 +1,193 @@
+import logging
+import re
+from typing import TYPE_CHECKING, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from ..config.settings import settings
+from ..utils.cache import dataset_version, make_cache, normalize_sql
+
+if TYPE_CHECKING:
+    from sqlparse.sql import Statement
+
+logger = logging.getLogger(__name__)
+
+# Functions that can stall or reach outside the database from a SELECT
+BLOCKED_FUNCTIONS = {"SLEEP", "BENCHMARK", "LOAD_FILE", "GET_LOCK", "RELEASE_LOCK", "RELEASE_ALL_LOCKS"}
+
+# Keywords that turn a SELECT into a write (SELECT ... INTO)
+BLOCKED_KEYWORDS = {"INTO"}
+
+# Keyword pairs that turn a SELECT into a locking read (FOR UPDATE/SHARE, LOCK IN SHARE MODE);
+# FOR on its own is also valid in SUBSTRING(x FROM 1 FOR 3)
+BLOCKED_SEQUENCES = {("FOR", "UPDATE"), ("FOR", "SHARE"), ("LOCK", "IN")}
+
+# What follows a top-level LIMIT: "count", "offset, count" or "count OFFSET offset"
+LIMIT_ARGUMENTS = re.compile(r"^\s*(\d+)\s*(?:,\s*(\d+)|\s+OFFSET\s+(\d+))?\s*$", re.IGNORECASE)
+
+
+class QueryRejected(Exception):
+    """Raised by QueryGovernor checks with a human-readable reason"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class QueryGovernor:
+    """
+    Reviews LLM-generated SQL before execution: only single read-only SELECT statements
+    pass, every statement is limited to the row cap, MySQL plans above a row estimate are
+    rejected and a per-statement execution time limit is applied.
+    """
+
+    def __init__(self):
+        # Verdicts depend on the data (EXPLAIN estimates), so they are keyed by dataset version
+        self._verdicts = make_cache("governor", 1024)
+
+    def review(self, db: Session, sql_query: str, row_limit: int, page: Optional[Tuple[int, int]] = None) -> str:
+        """
+        Return the SQL to execute, or raise HTTPException(400) with the rejection reason.
+        With page=(offset, count) the capped statement is wrapped so the server returns only
+        those rows.
+        """
+        dialect = db.bind.dialect.name if db.bind is not None else ""
+        cache_key = (normalize_sql(sql_query), row_limit, page, dialect, dataset_version.get())
+        verdict = self._verdicts.get(cache_key)
+        if verdict is None:
+            try:
+                verdict = (True, *self._govern(db, sql_query, row_limit, page, dialect))
+            except QueryRejected as rejection:
+                verdict = (False, sql_query, rejection.reason)
+            self._verdicts.set(cache_key, verdict)
+
+        allowed, sql, reason = verdict
+        if not allowed:
+            logger.warning(f"Query governor rejected SQL ({reason}): {sql}")
+            raise HTTPException(status_code=400, detail=f"Query rejected: {reason}")
+        logger.info(f"Query governor allowed SQL ({reason}): {sql}")
+        return sql
+
+    def stats(self) -> dict:
+        """Verdict cache statistics"""
+        return self._verdicts.stats()
+
+    def _govern(
+        self, db: Session, sql_query: str, row_limit: int, page: Optional[Tuple[int, int]], dialect: str
+    ) -> Tuple[str, str]:
+        """Return (sql to execute, reason) or raise QueryRejected"""
+        # Imported on first use to keep it out of worker startup
+        import sqlparse
+
+        sql = sqlparse.format(sql_query, strip_comments=True).strip().rstrip(";").strip()
+        statement = self._parse_single_select(sql)
+
+        reasons = []
+        sql, limit_reason = self._limit_rows(statement, row_limit)
+        if limit_reason:
+            reasons.append(limit_reason)
+        if page is not None:
+            offset, count = page
+            sql = f"SELECT * FROM ({sql}) AS page LIMIT {int(count)} OFFSET {int(offset)}"
+            reasons.append(f"page of {count} at offset {offset}")
+
+        if dialect == "mysql":
+            estimate = self._estimate_rows(db, sql)
+            if estimate > settings.query_max_estimated_rows:
+                raise QueryRejected(
+                    f"estimated {estimate:,} rows examined exceeds limit of {settings.query_max_estimated_rows:,}"
+                )
+            reasons.append(f"estimated {estimate:,} rows")
+
+            sql = self._add_execution_time_hint(sql, settings.query_timeout_ms)
+            reasons.append(f"MAX_EXECUTION_TIME {settings.query_timeout_ms}ms")
+
+        return sql, ", ".join(reasons) or "unchanged"
+
+    def _parse_single_select(self, sql: str) -> "Statement":
+        import sqlparse
+        from sqlparse import tokens as T
+
+        statements = [statement for statement in sqlparse.parse(sql) if str(statement).strip()]
+        if len(statements) != 1:
+            raise QueryRejected(f"expected exactly one statement, got {len(statements)}")
+        statement = statements[0]
+        if statement.get_type() != "SELECT":
+            raise QueryRejected(f"{statement.get_type()} statements are not allowed")
+
+        previous = None
+        for token in statement.flatten():
+            if token.is_whitespace or token.ttype in T.Comment:
+                continue
+            if (previous, token.normalized) in BLOCKED_SEQUENCES:
+                raise QueryRejected(f"{previous} {token.normalized} clauses are not allowed")
+            previous = token.normalized if token.ttype in T.Keyword else None
+            if token.ttype in T.DDL or (token.ttype in T.DML and token.normalized != "SELECT"):
+                raise QueryRejected(f"{token.normalized} is not allowed")
+            if token.ttype in T.Keyword and token.normalized in BLOCKED_KEYWORDS:
+                raise QueryRejected(f"{token.normalized} clauses are not allowed")
+            if token.ttype in T.Name and token.value.upper() in BLOCKED_FUNCTIONS:
+                raise QueryRejected(f"{token.value.upper()}() is not allowed")
+        return statement
+
+    def _limit_rows(self, statement: "Statement", row_limit: int) -> Tuple[str, Optional[str]]:
+        """
+        The statement returning at most row_limit rows, and what was changed: a LIMIT is
+        appended when there is none at the top level and a larger one is lowered. A LIMIT
+        that isn't plain numbers is kept, with the whole statement wrapped in a capped SELECT.
+        """
+        from sqlparse import tokens as T
+
+        tokens = [str(token) for token in statement.tokens]
+        sql = "".join(tokens).strip()
+        position = next(
+            (i for i, token in enumerate(statement.tokens) if token.ttype is T.Keyword and token.normalized == "LIMIT"),
+            None
+        )
+        if position is None:
+            return f"{sql} LIMIT {row_limit}", f"added LIMIT {row_limit}"
+
+        match = LIMIT_ARGUMENTS.match("".join(tokens[position + 1:]))
+        if match is None:
+            return f"SELECT * FROM ({sql}) AS limited LIMIT {row_limit}", f"wrapped in LIMIT {row_limit}"
+        if match.group(2) is not None:
+            offset, count = int(match.group(1)), int(match.group(2))
+        else:
+            count, offset = int(match.group(1)), int(match.group(3) or 0)
+        if count <= row_limit:
+            return sql, None
+        head = "".join(tokens[:position]).rstrip()
+        clause = f"LIMIT {row_limit} OFFSET {offset}" if offset else f"LIMIT {row_limit}"
+        return f"{head} {clause}", f"lowered LIMIT {count} to {row_limit}"
+
+    def _estimate_rows(self, db: Session, sql: str) -> int:
+        """
+        Rows examined according to EXPLAIN: tables sharing a select id are joined,
+        so their estimates multiply; separate select ids add up.
+        """
+        per_select = {}
+        for row in db.execute(text(f"EXPLAIN {sql}")).mappings():
+            rows = int(row.get("rows") or 1)
+            per_select[row.get("id")] = per_select.get(row.get("id"), 1) * max(rows, 1)
+        return sum(per_select.values())
+
+    def _add_execution_time_hint(self, sql: str, timeout_ms: int) -> str:
+        """Insert a MAX_EXECUTION_TIME optimizer hint after the top-level SELECT keyword"""
+        import sqlparse
+        from sqlparse import tokens as T
+
+        statement = sqlparse.parse(sql)[0]
+        parts = []
+        hinted = False
+        for token in statement.tokens:
+            parts.append(str(token))
+            if not hinted and token.ttype in T.DML and token.normalized == "SELECT":
+                parts.append(f" /*+ MAX_EXECUTION_TIME({timeout_ms}) */")
+                hinted = True
+        return "".join(parts)
+
+
+# Global query governor instance
+query_governor = QueryGovernor()
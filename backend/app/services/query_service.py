@@ -0,0 +1,138 @@
+import base64
+import csv
+import hashlib
+import hmac
+import io
+import json
+import logging
+import secrets
+from typing import Any, Dict, Iterator, List, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from ..config.database import engine
+from ..config.settings import settings
+from ..utils.cache import result_cache, dataset_version, normalize_sql, shared_value
+
+logger = logging.getLogger(__name__)
+
+
+class QueryService:
+    """Service for executing generated SQL in full, paginated or streaming mode"""
+
+    # Rows fetched per round trip from a server-side cursor
+    FETCH_SIZE = 1000
+
+    def __init__(self):
+        # Tokens embed the SQL to run, so they are signed; without QUERY_TOKEN_SECRET the
+        # secret is generated once and shared through the cache store in multi-worker mode
+        self._token_secret = (
+            settings.query_token_secret or shared_value("query_token_secret", lambda: secrets.token_hex(32))
+        ).encode()
+
+    def execute(self, db: Session, sql_query: str) -> List[Dict[str, Any]]:
+        """Execute a query and return every row, reusing results for the same SQL and dataset"""
+        cache_key = (normalize_sql(sql_query), dataset_version.get())
+        results = result_cache.get(cache_key)
+
+        if results is None:
+            result = db.execute(text(sql_query))
+            rows = result.fetchall()
+
+            # Convert to list of dictionaries
+            columns = result.keys()
+            results = [dict(zip(columns, row)) for row in rows]
+            result_cache.set(cache_key, results)
+
+        return results
+
+    def execute_page(self, db: Session, sql_query: str, page_size: int) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Execute one page of a query and return its rows and whether more rows follow.
+        sql_query must already select the page, reading one row past it, as
+        QueryGovernor.review does with page=(offset, page_size + 1): the database skips the
+        earlier rows and only the page crosses the wire. The server still evaluates the
+        query up to the page on every request; generated SQL has no ORDER BY key known to be
+        unique, so a keyset cannot be used. Pages are cached per dataset version, and deep
+        exports should use the streaming formats, which read the result once.
+        """
+        cache_key = (normalize_sql(sql_query), dataset_version.get(), page_size)
+        page = result_cache.get(cache_key)
+
+        if page is None:
+            result = db.execute(text(sql_query))
+            rows = result.fetchmany(page_size + 1)
+            columns = list(result.keys())
+            page = ([dict(zip(columns, row)) for row in rows[:page_size]], len(rows) > page_size)
+            result_cache.set(cache_key, page)
+
+        return page
+
+    def open_stream(self, sql_query: str, fmt: str) -> Iterator[bytes]:
+        """
+        Execute a query on a dedicated connection with a server-side cursor and return
+        an iterator of NDJSON or CSV chunks. Execution errors are raised here, before
+        any bytes are sent; the connection is closed when the iterator finishes.
+        """
+        connection = engine.connect().execution_options(stream_results=True)
+        try:
+            result = connection.execute(text(sql_query))
+        except Exception:
+            connection.close()
+            raise
+        return self._iter_rows(connection, result, fmt)
+
+    def _iter_rows(self, connection, result, fmt: str) -> Iterator[bytes]:
+        try:
+            columns = list(result.keys())
+            if fmt == "csv":
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerow(columns)
+                for rows in result.partitions(self.FETCH_SIZE):
+                    writer.writerows(rows)
+                    yield buffer.getvalue().encode()
+                    buffer.seek(0)
+                    buffer.truncate()
+                if buffer.tell():
+                    yield buffer.getvalue().encode()
+            else:
+                for rows in result.partitions(self.FETCH_SIZE):
+                    yield "".join(
+                        json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in rows
+                    ).encode()
+        finally:
+            result.close()
+            connection.close()
+
+    def encode_token(self, sql_query: str, offset: int, page_size: int) -> str:
+        """
+        Signed continuation token carrying the SQL, next offset, page size and dataset version.
+        Pass the SQL as generated, before governing: each page is governed again.
+        """
+        payload = base64.urlsafe_b64encode(
+            json.dumps([sql_query, offset, page_size, dataset_version.get()]).encode()
+        ).decode()
+        return f"{payload}.{self._sign(payload)}"
+
+    def decode_token(self, token: str) -> Tuple[str, int, int]:
+        """Verify a continuation token and return (sql_query, offset, page_size)"""
+        try:
+            payload, signature = token.rsplit(".", 1)
+            if not hmac.compare_digest(signature, self._sign(payload)):
+                raise ValueError("bad signature")
+            sql_query, offset, page_size, version = json.loads(base64.urlsafe_b64decode(payload.encode()))
+        except Exception:
+            raise HTTPException(status_code=400, detail="Invalid continuation token")
+        if version != dataset_version.get():
+            raise HTTPException(status_code=410, detail="Continuation token expired: the dataset has been reloaded")
+        return sql_query, int(offset), int(page_size)
+
+    def _sign(self, payload: str) -> str:
+        return hmac.new(self._token_secret, payload.encode(), hashlib.sha256).hexdigest()
+
+
+# Global query service instance
+query_service = QueryService()
@@ -0,0 +1,175 @@
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import inspect
+
+from ..config.database import engine
+from ..utils.cache import dataset_version
+from ..utils.sql_cache import normalize_question, question_tokens
+
+logger = logging.getLogger(__name__)
+
+# Tables the SQL model may query, in prompt order, with their descriptions
+PROMPT_TABLES = {
+    "merged_roster": "Contains healthcare provider information and demographics",
+    "duplicates": "Contains duplicate provider records with similarity scores",
+}
+
+# Used when the database cannot be introspected
+FALLBACK_SCHEMA: Dict[str, List[Tuple[str, str]]] = {
+    "merged_roster": [
+        ("provider_id", "TEXT"), ("npi", "BIGINT"), ("first_name", "TEXT"), ("last_name", "TEXT"),
+        ("credential", "TEXT"), ("full_name", "TEXT"), ("primary_specialty", "TEXT"),
+        ("practice_address_line1", "TEXT"), ("practice_address_line2", "TEXT"),
+        ("practice_city", "TEXT"), ("practice_state", "TEXT"), ("practice_zip", "TEXT"),
+        ("practice_phone", "TEXT"), ("mailing_address_line1", "TEXT"),
+        ("mailing_address_line2", "TEXT"), ("mailing_city", "TEXT"), ("mailing_state", "TEXT"),
+        ("mailing_zip", "TEXT"), ("license_number", "TEXT"), ("license_state", "TEXT"),
+        ("license_expiration", "DATE"), ("accepting_new_patients", "TEXT"),
+        ("board_certified", "TINYINT(1)"), ("years_in_practice", "BIGINT"),
+        ("medical_school", "TEXT"), ("residency_program", "TEXT"), ("last_updated", "DATE"),
+        ("taxonomy_code", "TEXT"), ("status", "TEXT"), ("npi_present", "TINYINT(1)"),
+    ],
+    "duplicates": [
+        ("provider_id_1", "TEXT"), ("provider_id_2", "TEXT"),
+        ("name_1", "TEXT"), ("name_2", "TEXT"), ("score", "DOUBLE"), ("name_score", "DOUBLE"),
+        ("npi_match", "TINYINT(1)"), ("addr_score", "DOUBLE"), ("phone_match", "TINYINT(1)"),
+        ("license_score", "DOUBLE"),
+    ],
+}
+
+# Bookkeeping columns that never appear in the prompt (row_hash is written by delta loads)
+HIDDEN_COLUMNS = frozenset({"row_hash"})
+
+# Columns always sent for a table, so the model can identify and label rows
+CORE_COLUMNS = {
+    "merged_roster": ["provider_id", "npi", "full_name", "primary_specialty"],
+    "duplicates": ["provider_id_1", "provider_id_2", "name_1", "name_2", "score"],
+}
+
+# Question words that select the duplicates table
+DUPLICATE_WORDS = frozenset({
+    "duplicate", "dup", "dupe", "similar", "similarity", "match", "matching", "pair", "score", "cluster"
+})
+
+# Column name parts too generic to select a column on their own
+NAME_PART_STOPWORDS = frozenset({"in", "new", "1", "2"})
+
+# Question words (singular, as produced by question_tokens) mapped to the columns they refer to.
+# Words that equal part of a column name ("city", "license", "phone") are matched without an entry.
+KEYWORD_COLUMNS = {
+    "expired": ["license_expiration", "status"],
+    "expiring": ["license_expiration"],
+    "expire": ["license_expiration"],
+    "compliance": ["license_expiration", "license_state", "status", "npi_present"],
+    "missing": ["npi_present", "license_number", "practice_phone"],
+    "located": ["practice_city", "practice_state"],
+    "location": ["practice_city", "practice_state"],
+    "where": ["practice_city", "practice_state"],
+    "address": ["practice_address_line1", "practice_city", "practice_state", "practice_zip"],
+    "experience": ["years_in_practice"],
+    "year": ["years_in_practice"],
+    "experienced": ["years_in_practice"],
+    "senior": ["years_in_practice"],
+    "accepting": ["accepting_new_patients"],
+    "patient": ["accepting_new_patients"],
+    "certified": ["board_certified"],
+    "certification": ["board_certified"],
+    "school": ["medical_school"],
+    "education": ["medical_school", "residency_program"],
+    "trained": ["medical_school", "residency_program"],
+    "updated": ["last_updated"],
+    "recent": ["last_updated"],
+    "stale": ["last_updated"],
+    "active": ["status"],
+    "inactive": ["status"],
+    "specialist": ["primary_specialty"],
+    "doctor": ["credential"],
+    "nurse": ["credential"],
+    "degree": ["credential"],
+    "name": ["first_name", "last_name"],
+    "zipcode": ["practice_zip"],
+    "telephone": ["practice_phone"],
+    "identifier": ["npi"],
+}
+
+
+class SchemaService:
+    """
+    Schema text for SQL generation prompts.
+    Column lists are introspected from the database once per dataset version;
+    each prompt then includes only the tables and columns relevant to the question.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._schema: Optional[Dict[str, List[Tuple[str, str]]]] = None
+        self._version: Optional[int] = None
+
+    def get_schema(self) -> Dict[str, List[Tuple[str, str]]]:
+        """Column (name, type) pairs per prompt table, reloaded after a dataset reload"""
+        version = dataset_version.get()
+        with self._lock:
+            if self._schema is None or self._version != version:
+                self._schema, introspected = self._introspect()
+                # Retry introspection on the next prompt if the database was unreachable
+                self._version = version if introspected else None
+            return self._schema
+
+    def _introspect(self) -> Tuple[Dict[str, List[Tuple[str, str]]], bool]:
+        try:
+            inspector = inspect(engine)
+            existing = set(inspector.get_table_names())
+            schema = {}
+            for table in PROMPT_TABLES:
+                if table in existing:
+                    schema[table] = [
+                        (column["name"], str(column["type"]))
+                        for column in inspector.get_columns(table)
+                        if column["name"] not in HIDDEN_COLUMNS
+                    ]
+                else:
+                    schema[table] = FALLBACK_SCHEMA[table]
+            return schema, True
+        except Exception as e:
+            logger.warning(f"Schema introspection failed, using built-in schema: {str(e)}")
+            return FALLBACK_SCHEMA, False
+
+    def schema_text(self, question: Optional[str] = None) -> str:
+        """
+        Schema block for the prompt. With a question, only the relevant tables and
+        columns are listed; without one, every prompt table is listed in full.
+        """
+        schema = self.get_schema()
+        tokens = question_tokens(normalize_question(question)) if question is not None else None
+
+        blocks = []
+        for table, description in PROMPT_TABLES.items():
+            columns = schema.get(table, [])
+            if tokens is not None:
+                if table == "duplicates" and not tokens & DUPLICATE_WORDS:
+                    continue
+                wanted = self._relevant_columns(table, [name for name, _ in columns], tokens)
+                # Core columns lead so pruned prompts still share a long common prefix
+                core = CORE_COLUMNS.get(table, [])
+                columns = sorted(
+                    (column for column in columns if column[0] in wanted),
+                    key=lambda column: core.index(column[0]) if column[0] in core else len(core)
+                )
+            column_list = ", ".join(f"{name} ({column_type})" for name, column_type in columns)
+            blocks.append(f"Table: {table}\nColumns: {column_list}\nDescription: {description}")
+        return "\n\n".join(blocks)
+
+    def _relevant_columns(self, table: str, names: List[str], tokens) -> set:
+        wanted = set(CORE_COLUMNS.get(table, []))
+        for token in tokens:
+            wanted.update(KEYWORD_COLUMNS.get(token, []))
+        for name in names:
+            if tokens & (set(name.split("_")) - NAME_PART_STOPWORDS):
+                wanted.add(name)
+        return wanted
+
+
+# Global schema service instance
+schema_service = SchemaService()
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional
+
+import httpx
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+
+from ..config.database import engine
+from ..config.settings import settings
+from .ai_service import ai_service
+
+logger = logging.getLogger(__name__)
+
+# Read endpoints requested once with their default parameters, filling the response cache
+WARMUP_PATHS = [
+    "/analytics/specialty-experience",
+    "/analytics/providers-by-specialty",
+    "/analytics/providers-by-state",
+    "/analytics/providers-by-city",
+    "/analytics/license-expirations",
+    "/providers/duplicates",
+]
+
+# Sent once so the model loads and caches the shared system prompt prefix
+PRIMING_QUESTION = "How many providers are there?"
+
+
+class WarmupService:
+    """
+    Optional startup warm-up: opens pooled DB connections, parses reference data,
+    runs the analytics queries once and primes the SQL model. Readiness stays
+    false until every configured step has finished, successfully or not.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.steps: Dict[str, str] = {}
+        self.duration_ms: Optional[float] = None
+
+    def mark_ready(self) -> None:
+        self.ready = True
+
+    async def run(self, app) -> None:
+        started = time.perf_counter()
+        enabled = [step for step in settings.warmup_steps.split(",") if step.strip()]
+        self.steps = {step.strip(): "pending" for step in enabled}
+
+        # Analytics queries reuse the connections opened by the pool step
+        await asyncio.gather(
+            self._run_steps(["pool", "analytics"], app),
+            self._run_steps(["reference"], app),
+            self._run_steps(["model"], app)
+        )
+        for step, state in self.steps.items():
+            if state == "pending":
+                self.steps[step] = "skipped: unknown step"
+
+        self.duration_ms = round((time.perf_counter() - started) * 1000, 1)
+        self.ready = True
+        logger.info(f"Warm-up finished in {self.duration_ms}ms: {self.steps}")
+
+    async def _run_steps(self, names: List[str], app) -> None:
+        actions = {
+            "pool": lambda: run_in_threadpool(self._prime_pool),
+            "reference": lambda: run_in_threadpool(self._load_reference_data),
+            "analytics": lambda: self._prime_endpoints(app),
+            "model": lambda: ai_service.request_sql(PRIMING_QUESTION),
+        }
+        for name in names:
+            if name not in self.steps:
+                continue
+            started = time.perf_counter()
+            try:
+                await actions[name]()
+                self.steps[name] = f"done in {round((time.perf_counter() - started) * 1000, 1)}ms"
+            except Exception as e:
+                logger.warning(f"Warm-up step {name} failed: {str(e)}")
+                self.steps[name] = f"failed: {str(e)}"
+
+    def _prime_pool(self) -> None:
+        """Hold several connections at once so the pool opens that many"""
+        size = settings.warmup_db_connections
+        if hasattr(engine.pool, "size"):
+            size = min(size, engine.pool.size())
+        connections = []
+        try:
+            for _ in range(size):
+                connection = engine.connect()
+                connections.append(connection)
+                connection.execute(text("SELECT 1"))
+        finally:
+            for connection in connections:
+                connection.close()
+
+    @staticmethod
+    def _load_reference_data() -> None:
+        # Imported here so the pipeline and pandas only load when this step is enabled
+        from .data_service import data_service
+        data_service.load_reference_data()
+
+    async def _prime_endpoints(self, app) -> None:
+        """Request each read endpoint in-process, exactly as a client would"""
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://warmup") as client:
+            failed = []
+            for path in WARMUP_PATHS:
+                response = await client.get(path)
+                if response.status_code >= 400:
+                    failed.append(f"{path} ({response.status_code})")
+        if failed:
+            raise RuntimeError(", ".join(failed))
+
+    def status(self) -> dict:
+        return {
+            "status": "ready" if self.ready else "not ready",
+            "warmup": self.steps,
+            "warmup_duration_ms": self.duration_ms
+        }
+
+
+# Global warm-up service instance
+warmup_service = WarmupService()
@@ -0,0 +1,171 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from ..config.settings import settings
+from .shared_store import SharedCache, SharedDatasetVersion, SharedStore
+
+
+class LRUCache:
+    """
+    Thread-safe in-process LRU cache with hit/miss counters.
+    Bounded by entry count and, when max_bytes is set, by the total sizeof() of its values.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int = 0, sizeof: Optional[Callable[[Any], int]] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof or (lambda value: 0)
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._sizes: dict = {}
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            if key not in self._data:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._data[key]
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Like get(), without counting a hit or miss"""
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        size = self._sizeof(value) if self.max_bytes else 0
+        if self.max_bytes and size > self.max_bytes:
+            return
+        with self._lock:
+            self._pop(key)
+            self._data[key] = value
+            self._sizes[key] = size
+            self.total_bytes += size
+            while len(self._data) > self.max_entries or (self.max_bytes and self.total_bytes > self.max_bytes):
+                self._pop(next(iter(self._data)))
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._pop(key)
+
+    def items(self) -> list:
+        """Snapshot of (key, value) pairs, least recently used first"""
+        with self._lock:
+            return list(self._data.items())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self.total_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self.total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+    def _pop(self, key: Hashable) -> None:
+        """Remove a key; caller holds the lock"""
+        if key in self._data:
+            del self._data[key]
+            self.total_bytes -= self._sizes.pop(key, 0)
+
+
+class DatasetVersion:
+    """
+    Version of the loaded dataset, bumped whenever process_csv_file commits.
+    Seeded from the start time so ETags issued before a restart are never reused.
+    """
+
+    def __init__(self):
+        self._value = int(time.time() * 1000)
+        self._lock = threading.Lock()
+
+    def get(self) -> int:
+        return self._value
+
+    def bump(self) -> int:
+        with self._lock:
+            self._value += 1
+            return self._value
+
+
+def normalize_sql(sql: str) -> str:
+    """Lowercase and collapse whitespace outside quoted literals, drop a trailing semicolon"""
+    parts = re.split(r"""('(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.)*"|`[^`]*`)""", sql.strip().rstrip(";"))
+    return "".join(
+        part if i % 2 else re.sub(r"\s+", " ", part.lower())
+        for i, part in enumerate(parts)
+    ).strip()
+
+
+def json_size(value: Any) -> int:
+    """Approximate in-memory footprint of a JSON-like value by its encoded length"""
+    return len(json.dumps(value, default=str))
+
+
+# With SHARED_CACHE_PATH set, caches and the dataset version are shared by all worker processes
+shared_store = SharedStore(settings.shared_cache_path) if settings.shared_cache_path else None
+
+
+def make_cache(namespace: str, max_entries: int, max_bytes: int = 0,
+               sizeof: Optional[Callable[[Any], int]] = None):
+    """LRUCache for this process, or a SharedCache namespace in multi-worker mode"""
+    if shared_store is not None:
+        return SharedCache(shared_store, namespace, max_entries, max_bytes, sizeof)
+    return LRUCache(max_entries, max_bytes, sizeof)
+
+
+def shared_value(name: str, create: Callable[[], str]) -> str:
+    """A value every worker agrees on (e.g. a signing secret); per process without a shared store"""
+    if shared_store is not None:
+        return shared_store.get_or_create(name, create)
+    return create()
+
+
+dataset_version = SharedDatasetVersion(shared_store) if shared_store is not None else DatasetVersion()
+response_cache = make_cache("response", settings.response_cache_size)
+# Executed /query results keyed by (normalized SQL, dataset version)
+result_cache = make_cache("result", settings.result_cache_entries, max_bytes=settings.result_cache_max_bytes, sizeof=json_size)
+
+
+def cached_response(request: Request, build: Callable[[], Any], extra: str = "") -> Response:
+    """
+    Serve a read endpoint from the response cache.
+    The ETag is derived from route, query parameters and dataset version only,
+    so a matching If-None-Match is answered with 304 before build() runs.
+    """
+    key = (request.url.path, tuple(sorted(request.query_params.multi_items())), dataset_version.get(), extra)
+    etag = '"' + hashlib.sha1(repr(key).encode()).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if any(tag.strip().removeprefix("W/") in (etag, "*") for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+
+    body = response_cache.get(key)
+    if body is None:
+        body = json.dumps(jsonable_encoder(build())).encode()
+        response_cache.set(key, body)
+    return Response(content=body, media_type="application/json", headers=headers)
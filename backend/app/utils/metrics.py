@@ -0,0 +1,143 @@
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Latency buckets in seconds, from fast cached reads to slow model generations
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# A sample is (name suffix, labels, value); a family is (name, type, help, samples)
+Sample = Tuple[str, Dict[str, str], float]
+Family = Tuple[str, str, str, List[Sample]]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def collect(self) -> List[Family]:
+        with self._lock:
+            samples = [("", dict(zip(self.label_names, key)), value) for key, value in self._values.items()]
+        return [(self.name, "counter", self.help, samples)]
+
+
+class Histogram:
+    """Cumulative histogram with optional labels"""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[tuple, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += 1
+            state[-1] += value
+
+    def collect(self) -> List[Family]:
+        samples: List[Sample] = []
+        with self._lock:
+            items = [(key, list(state)) for key, state in self._values.items()]
+        for key, state in items:
+            labels = dict(zip(self.label_names, key))
+            for bound, count in zip(self.buckets, state):
+                samples.append(("_bucket", {**labels, "le": _format_value(bound)}, count))
+            samples.append(("_bucket", {**labels, "le": "+Inf"}, state[-2]))
+            samples.append(("_sum", labels, state[-1]))
+            samples.append(("_count", labels, state[-2]))
+        return [(self.name, "histogram", self.help, samples)]
+
+
+class MetricsRegistry:
+    """Metrics plus collector callbacks evaluated at scrape time, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: list = []
+        self._collectors: List[Callable[[], Iterable[Family]]] = []
+
+    def counter(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, help_text, label_names)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, label_names: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, label_names, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], Iterable[Family]]) -> None:
+        """Register a callback returning (name, type, help, [(suffix, labels, value), ...]) families"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        families: List[Family] = []
+        for metric in self._metrics:
+            families.extend(metric.collect())
+        for collector in self._collectors:
+            families.extend(collector())
+
+        for name, metric_type, help_text, samples in families:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for suffix, labels, value in samples:
+                lines.append(f"{name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUESTS = registry.counter(
+    "http_requests_total", "HTTP requests by method, route and status code", ("method", "route", "status")
+)
+HTTP_LATENCY = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by method and route", ("method", "route")
+)
+MODEL_LATENCY = registry.histogram(
+    "sql_model_request_duration_seconds", "SQL generation model call latency"
+)
+MODEL_ERRORS = registry.counter(
+    "sql_model_errors_total", "Failed SQL generation model calls by reason", ("reason",)
+)
+PIPELINE_DURATION = registry.histogram(
+    "pipeline_job_duration_seconds", "Roster processing job duration by stage", ("stage",),
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+)
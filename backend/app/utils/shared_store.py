@@ -0,0 +1,207 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Hashable, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    key_data BLOB NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS idx_cache_entries_lru ON cache_entries (namespace, last_used);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class SharedStore:
+    """
+    SQLite file shared by every worker process on a host.
+    Each process (and each process after a fork) opens its own connection;
+    WAL mode lets readers in one worker proceed while another writes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """Connection for the current process; caller holds the lock"""
+        if self._connection is None or self._pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(SCHEMA)
+            self._connection, self._pid = connection, os.getpid()
+        return self._connection
+
+    def execute(self, sql: str, params: tuple = ()) -> list:
+        with self._lock:
+            return self._connect().execute(sql, params).fetchall()
+
+    def transaction(self, work: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Run work(connection) inside BEGIN IMMEDIATE, so writers across processes serialize"""
+        with self._lock:
+            connection = self._connect()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(connection)
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+            return result
+
+    def get_or_create(self, name: str, create: Callable[[], str]) -> str:
+        """Shared value from the meta table, created by whichever process asks first"""
+        def work(connection):
+            connection.execute("INSERT OR IGNORE INTO meta (key, value) VALUES (?, ?)", (name, create()))
+            return connection.execute("SELECT value FROM meta WHERE key = ?", (name,)).fetchone()[0]
+        return self.transaction(work)
+
+    @staticmethod
+    def reset(path: str) -> None:
+        """Delete a store file and its WAL companions, e.g. before starting a fresh set of workers"""
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+class SharedCache:
+    """
+    LRU cache held in a SharedStore namespace, with the same interface as LRUCache.
+    Keys are hashed from their repr(); values are pickled. Hit/miss counters are
+    per process, entries and bytes are shared.
+    """
+
+    def __init__(self, store: SharedStore, namespace: str, max_entries: int, max_bytes: int = 0,
+                 sizeof: Optional[Callable[[Any], int]] = None):
+        self.store = store
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof or (lambda value: 0)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _hash(key: Hashable) -> str:
+        return hashlib.sha1(repr(key).encode()).hexdigest()
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Like get(), without counting a hit or miss"""
+        hashed = self._hash(key)
+        rows = self.store.execute(
+            "SELECT value FROM cache_entries WHERE namespace = ? AND key = ?", (self.namespace, hashed)
+        )
+        if not rows:
+            return None
+        self.store.execute(
+            "UPDATE cache_entries SET last_used = ? WHERE namespace = ? AND key = ?",
+            (time.time(), self.namespace, hashed)
+        )
+        return pickle.loads(rows[0][0])
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        value = self.peek(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        size = self._sizeof(value) if self.max_bytes else 0
+        if self.max_bytes and size > self.max_bytes:
+            return
+        row = (self.namespace, self._hash(key), pickle.dumps(key), pickle.dumps(value), size, time.time())
+
+        def work(connection):
+            connection.execute(
+                "INSERT OR REPLACE INTO cache_entries (namespace, key, key_data, value, size, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)", row
+            )
+            # Evict least recently used entries beyond the entry limit
+            connection.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key IN ("
+                "SELECT key FROM cache_entries WHERE namespace = ? ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.namespace, self.namespace, self.max_entries)
+            )
+            if self.max_bytes:
+                total = connection.execute(
+                    "SELECT COALESCE(SUM(size), 0) FROM cache_entries WHERE namespace = ?", (self.namespace,)
+                ).fetchone()[0]
+                oldest = connection.execute(
+                    "SELECT key, size FROM cache_entries WHERE namespace = ? ORDER BY last_used", (self.namespace,)
+                )
+                evict = []
+                for hashed, entry_size in oldest:
+                    if total <= self.max_bytes:
+                        break
+                    evict.append((self.namespace, hashed))
+                    total -= entry_size
+                connection.executemany("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", evict)
+
+        self.store.transaction(work)
+
+    def delete(self, key: Hashable) -> None:
+        self.store.execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (self.namespace, self._hash(key))
+        )
+
+    def items(self) -> list:
+        """Snapshot of (key, value) pairs, least recently used first"""
+        rows = self.store.execute(
+            "SELECT key_data, value FROM cache_entries WHERE namespace = ? ORDER BY last_used", (self.namespace,)
+        )
+        return [(pickle.loads(key), pickle.loads(value)) for key, value in rows]
+
+    def clear(self) -> None:
+        self.store.execute("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
+
+    def stats(self) -> dict:
+        entries, total_bytes = self.store.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries WHERE namespace = ?", (self.namespace,)
+        )[0]
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "bytes": total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+class SharedDatasetVersion:
+    """DatasetVersion kept in a SharedStore, so a bump in one worker invalidates caches in all of them"""
+
+    KEY = "dataset_version"
+
+    def __init__(self, store: SharedStore):
+        self.store = store
+        self.store.get_or_create(self.KEY, lambda: str(int(time.time() * 1000)))
+
+    def get(self) -> int:
+        return int(self.store.execute("SELECT value FROM meta WHERE key = ?", (self.KEY,))[0][0])
+
+    def bump(self) -> int:
+        def work(connection):
+            connection.execute("UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = ?", (self.KEY,))
+            return int(connection.execute("SELECT value FROM meta WHERE key = ?", (self.KEY,)).fetchone()[0])
+        return self.store.transaction(work)
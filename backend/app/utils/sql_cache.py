@@ -0,0 +1,131 @@
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+from typing import FrozenSet, Optional
+
+from .cache import make_cache
+
+logger = logging.getLogger(__name__)
+
+# Words that don't change what a question asks for
+STOPWORDS = frozenset({
+    "a", "an", "the", "of", "is", "are", "me", "please", "show", "list",
+    "what", "which", "give", "find", "get", "tell", "do", "does"
+})
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace"""
+    question = re.sub(r"[^\w\s]", " ", question.lower())
+    return " ".join(question.split())
+
+
+def question_tokens(normalized: str) -> FrozenSet[str]:
+    """Content tokens of a normalized question, with a naive plural strip"""
+    return frozenset(
+        token[:-1] if len(token) > 3 and token.endswith("s") else token
+        for token in normalized.split()
+        if token not in STOPWORDS
+    )
+
+
+def question_key(normalized: str) -> str:
+    """Content tokens in sorted order: equal for questions differing only in stopwords, plurals or word order"""
+    return " ".join(sorted(question_tokens(normalized)))
+
+
+class SQLCache:
+    """
+    Maps questions to SQL that has already executed successfully.
+    Entries are keyed by question_key, so a rephrasing that only adds or drops stopwords,
+    pluralizes or reorders words reuses the SQL. Every other word has to match, because
+    a single one ("not", a state, a number) can change the query.
+    Entries live in the "sql" cache namespace, shared across workers when configured.
+    With a path, remember() and forget() also rewrite the cache file, so callers on
+    the event loop run them in a thread.
+    """
+
+    def __init__(self, max_entries: int, path: str = ""):
+        self._store = make_cache("sql", max_entries)
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.similar_hits = 0
+        if self.path:
+            self._load()
+
+    def lookup(self, question: str) -> Optional[str]:
+        normalized = normalize_question(question)
+        entry = self._store.peek(question_key(normalized))
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[1] == normalized:
+                self.hits += 1
+            else:
+                self.similar_hits += 1
+        return entry[0]
+
+    def remember(self, question: str, sql: str) -> None:
+        normalized = normalize_question(question)
+        self._store.set(question_key(normalized), (sql, normalized))
+        if self.path:
+            self._save()
+
+    def forget(self, question: str) -> None:
+        self._store.delete(question_key(normalize_question(question)))
+        if self.path:
+            self._save()
+
+    def items(self) -> list:
+        return self._store.items()
+
+    def stats(self) -> dict:
+        stats = self._store.stats()
+        with self._lock:
+            lookups = self.hits + self.misses + self.similar_hits
+            stats.update({
+                "hits": self.hits,
+                "misses": self.misses,
+                "similar_hits": self.similar_hits,
+                "hit_ratio": round((self.hits + self.similar_hits) / lookups, 4) if lookups else 0.0
+            })
+        return stats
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                for normalized, sql in json.load(f):
+                    self._store.set(question_key(normalized), (sql, normalized))
+            logger.info(f"Loaded {len(self.items())} cached SQL queries from {self.path}")
+        except Exception as e:
+            logger.warning(f"Could not load SQL cache from {self.path}: {str(e)}")
+
+    def _save(self) -> None:
+        """
+        Replace the cache file with the current entries. Each save writes its own temp
+        file next to it, so workers saving at the same time never share one.
+        """
+        with self._save_lock:
+            entries: list = [(normalized, sql) for _, (sql, normalized) in self.items()]
+            tmp_path = None
+            try:
+                with tempfile.NamedTemporaryFile(
+                    "w", dir=os.path.dirname(os.path.abspath(self.path)),
+                    prefix=f"{os.path.basename(self.path)}.", suffix=".tmp", delete=False
+                ) as f:
+                    tmp_path = f.name
+                    json.dump(entries, f)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                logger.warning(f"Could not persist SQL cache to {self.path}: {str(e)}")
+                if tmp_path is not None and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
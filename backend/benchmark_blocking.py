@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Compare blocking strategies for duplicate detection: dropping blocks larger than
+max_block versus splitting them by secondary keys. For each block budget, reports
+candidate pairs, duplicate pairs found, recall against an unlimited-block run,
+and time. A small budget on a small roster stands in for large-metro blocks at scale.
+
+Usage: python3 benchmark_blocking.py [--roster PATH] [--budgets 25,50,100] [--threshold 0.72]
+"""
+import argparse
+import os
+import time
+
+import pipeline
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_ROSTER = os.path.join(BACKEND_DIR, "..", "data", "provider_roster_with_errors.csv")
+
+
+def run(roster, threshold: float, max_block: int, sub_block: bool) -> dict:
+    detector = pipeline.DuplicateDetector(threshold=threshold, max_block=max_block, sub_block=sub_block)
+    started = time.perf_counter()
+    dup_df, _, _, summary = detector.detect(roster)
+    pairs = set() if dup_df.empty else set(zip(dup_df["i1"], dup_df["i2"]))
+    return {
+        "pairs": pairs,
+        "candidate_pairs": summary["candidate_pairs"],
+        "seconds": time.perf_counter() - started,
+        **detector.block_stats
+    }
+
+
+def main(roster_path: str, budgets, threshold: float) -> None:
+    roster = pipeline.read_table(roster_path)
+    reference = run(roster, threshold, max_block=len(roster) + 1, sub_block=False)
+    found = len(reference["pairs"])
+    print(f"{len(roster)} records, {found} duplicate pairs with unlimited blocks "
+          f"({reference['candidate_pairs']} candidate pairs, {reference['seconds']:.2f}s)")
+    print(f"{'budget':>6} {'strategy':>8} {'candidates':>10} {'duplicates':>10} {'recall':>7} "
+          f"{'oversized':>9} {'dropped':>7} {'seconds':>7}")
+    for budget in budgets:
+        for strategy, sub_block in (("drop", False), ("split", True)):
+            result = run(roster, threshold, budget, sub_block)
+            recall = len(result["pairs"] & reference["pairs"]) / found if found else 1.0
+            print(f"{budget:>6} {strategy:>8} {result['candidate_pairs']:>10} {len(result['pairs']):>10} "
+                  f"{recall:>7.3f} {result['oversized_blocks']:>9} {result['dropped_blocks']:>7} {result['seconds']:>7.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--roster", default=DEFAULT_ROSTER, help="roster file (CSV, Parquet or Arrow)")
+    parser.add_argument("--budgets", default="25,50,100", help="comma-separated max_block values")
+    parser.add_argument("--threshold", type=float, default=0.72, help="duplicate score threshold")
+    args = parser.parse_args()
+    main(args.roster, [int(b) for b in args.budgets.split(",")], args.threshold)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Measure SQL generation latency against the configured model, with the full
+schema in every prompt versus the question-relevant subset, each with and
+without the server reusing its KV cache for the shared prompt prefix.
+
+Usage: python3 benchmark_sql_generation.py [--repeat N]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.services.ai_service import ai_service
+
+QUESTIONS = [
+    "How many providers are there in each state?",
+    "Which providers have expired licenses?",
+    "Show the top 10 specialties by average years in practice",
+    "List duplicate pairs with an NPI match and score above 0.9",
+    "How many providers are accepting new patients by city?",
+    "Which providers are missing an NPI?",
+    "Count board certified providers per specialty",
+    "Show providers whose license expires this year",
+]
+
+
+async def run_mode(prune: bool, cache_prompt: bool, repeat: int) -> dict:
+    """Median and mean latency over every question, calling the model directly (no SQL cache)"""
+    ai_service.prune_schema = prune
+    ai_service.cache_prompt = cache_prompt
+    latencies, prompt_chars = [], []
+    for _ in range(repeat):
+        for question in QUESTIONS:
+            messages = await ai_service.build_messages(question)
+            prompt_chars.append(sum(len(message["content"]) for message in messages))
+            started = time.perf_counter()
+            await ai_service.request_sql(question)
+            latencies.append(time.perf_counter() - started)
+    return {
+        "median_s": statistics.median(latencies),
+        "mean_s": statistics.mean(latencies),
+        "mean_prompt_chars": statistics.mean(prompt_chars),
+        "calls": len(latencies),
+    }
+
+
+async def main(repeat: int) -> None:
+    try:
+        # Warm the connection and the server's prefix cache before timing
+        await ai_service.request_sql(QUESTIONS[0])
+        results = {
+            "full, cold": await run_mode(False, False, repeat),
+            "pruned, cold": await run_mode(True, False, repeat),
+            "full, cached": await run_mode(False, True, repeat),
+            "pruned, cached": await run_mode(True, True, repeat),
+        }
+    finally:
+        await ai_service.close()
+
+    print(f"{'mode':<16}{'calls':>7}{'prompt chars':>14}{'median s':>10}{'mean s':>9}")
+    for mode, stats in results.items():
+        print(
+            f"{mode:<16}{stats['calls']:>7}{stats['mean_prompt_chars']:>14.0f}"
+            f"{stats['median_s']:>10.3f}{stats['mean_s']:>9.3f}"
+        )
+    baseline = results["full, cold"]["median_s"]
+    for mode, stats in results.items():
+        print(f"{mode}: {baseline / stats['median_s']:.2f}x median speedup over full, cold")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3, help="passes over the question set per mode")
+    asyncio.run(main(parser.parse_args().repeat))
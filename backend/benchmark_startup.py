@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Measure worker startup: time to import app.main, which heavy modules that import
+pulls in, and time from launching uvicorn to the first successful response.
+
+Usage: python3 benchmark_startup.py [--runs N]
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Modules that should only load once a roster is processed
+HEAVY_MODULES = ["pandas", "numpy", "pipeline", "multiprocessing.pool", "sqlparse"]
+
+IMPORT_PROBE = f"""
+import json, sys, time
+started = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import() -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_first_response(timeout: float = 60.0) -> float:
+    """Seconds from spawning uvicorn until GET /health/live returns 200"""
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+                connection.request("GET", "/health/live")
+                if connection.getresponse().status == 200:
+                    return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError("server did not respond in time")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main(runs: int) -> None:
+    imports = [measure_import() for _ in range(runs)]
+    first_responses = [measure_first_response() for _ in range(runs)]
+
+    print(f"import app.main        median {statistics.median(i['seconds'] for i in imports):.3f}s over {runs} runs")
+    print(f"heavy modules loaded   {', '.join(imports[-1]['loaded']) or 'none'}")
+    print(f"time to first response median {statistics.median(first_responses):.3f}s over {runs} runs")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="runs per measurement")
+    main(parser.parse_args().runs)
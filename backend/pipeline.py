@@ -1,9 +1,17 @@
+import argparse
+import glob
+import heapq
+import io
+import json
 import re
+import sys
+import tempfile
 import time
+import zlib
 from collections import defaultdict
 from itertools import combinations
 from multiprocessing import Pool, cpu_count
-from typing import Dict, List, Tuple, Set, Optional
+from typing import Callable, Dict, Hashable, Iterable, Iterator, List, Tuple, Set, Optional
 import pandas as pd
 import numpy as np
 import os
@@ -57,57 +65,197 @@ def phone_match(p1, p2) -> float:
         return 1.0 if d1[-l:] == d2[-l:] else 0.0
     return 0.0
 
+def normalize_phone(val) -> Optional[str]:
+    """Phone number as digits only, or None when it has no digits"""
+    if pd.isna(val):
+        return None
+    digits = re.sub(r'\D+', '', str(val))
+    return digits if digits else None
+
+def normalize_zip(val) -> Optional[str]:
+    """ZIP code as 5 digits (zero-padded) or ZIP+4, or None when it has no digits"""
+    if pd.isna(val):
+        return None
+    digits = re.sub(r'\D+', '', str(val).strip())
+    if digits == "":
+        return None
+    if len(digits) < 5:
+        return digits.zfill(5)
+    if len(digits) == 5:
+        return digits
+    if len(digits) == 9:
+        return digits[:5] + "-" + digits[5:]
+    return digits
+
+def to_title(val) -> Optional[str]:
+    if pd.isna(val):
+        return None
+    return str(val).strip().title()
+
+# Distinct value -> normalized value per normalizer, kept across uploads for the low-cardinality
+# columns that opt in (cities, states, schools). Cleared after a call leaves a normalizer over
+# the limit, so it never stays resident above it.
+NORMALIZE_MEMO_LIMIT = 200_000
+_normalize_memo: Dict[Hashable, Dict] = defaultdict(dict)
+
+# Standardized columns with few distinct values, worth remembering across uploads
+MEMO_COLUMNS = frozenset({"practice_city", "mailing_city", "medical_school", "residency_program"})
+
+def normalize_unique(series: pd.Series, func: Callable, memo_key: Optional[Hashable] = None, memo: bool = False) -> pd.Series:
+    """
+    Apply func to each distinct value of series once and map the results back
+    through category codes, so the cost depends on distinct values, not rows.
+    With memo=True results are also remembered per normalizer (func, or memo_key
+    for lambdas/partials) across calls; only use it for low-cardinality columns,
+    since per-row values (names, addresses, phones, ids) would stay resident.
+    """
+    if len(series) == 0:
+        return series.apply(func)
+    codes, uniques = pd.factorize(series)
+    cache = _normalize_memo[memo_key or func] if memo else {}
+    results = []
+    for value in uniques:
+        # The type is part of the key so 1, 1.0 and True stay distinct
+        key = (type(value), value)
+        if key not in cache:
+            cache[key] = func(value)
+        results.append(cache[key])
+    if (codes == -1).any():
+        # factorize codes missing values as -1, which indexes this last entry
+        results.append(func(np.nan))
+    if len(cache) > NORMALIZE_MEMO_LIMIT:
+        cache.clear()
+    mapped = pd.Series(results).to_numpy()
+    return pd.Series(mapped[codes], index=series.index, name=series.name)
+
+def clear_normalize_memo() -> None:
+    _normalize_memo.clear()
+
+# Preprocessed columns the blocking keys are derived from
+BLOCK_KEY_COLUMNS = ["_npi", "_phone", "_license", "_zip3", "_city_state", "_name_key", "_last"]
+
+# Secondary keys used in order to split blocks larger than max_block: (label, column, prefix length)
+SUB_BLOCK_KEYS = [("last", "_last", 3), ("first", "_first", 1), ("street", "_street_no", None)]
+
+# Rows per sorted-neighbourhood block, taken in last-name order
+SN_WINDOW = 40
+
+# Weight of each component in the pair score
+SCORE_WEIGHTS = {"name":0.27, "npi":0.0, "addr":0.08, "phone":0.5, "license":0.15}
+
 class DuplicateDetector:
-    def __init__(self, threshold=0.7, ngram_n=2, parallel=False, min_block=1, max_block=500):
+    def __init__(self, threshold=0.7, ngram_n=2, parallel=False, min_block=1, max_block=500, sub_block=True, cache_scores=True,
+                 prune=True):
         self.threshold = float(threshold)
         self.ngram_n = int(ngram_n)
         self.parallel = bool(parallel)
         self.min_block = int(min_block)
         self.max_block = int(max_block)
+        self.sub_block = bool(sub_block)
+        self.cache_scores = bool(cache_scores)
+        # Skip the n-gram Jaccards of pairs whose score bound cannot reach the threshold
+        self.prune = bool(prune)
+        self.block_stats: Dict[str, int] = {}
         self._score_cache: Dict[Tuple[int,int], Tuple[float, Dict]] = {}
 
     def preprocess(self, df: pd.DataFrame) -> pd.DataFrame:
         df = df.copy().reset_index(drop=True)
-        df["_clean_name"] = df.get("full_name", "").fillna("").astype(str).apply(clean_text)
-        df["_first"] = df.get("first_name", "").fillna("").astype(str).apply(clean_text)
-        df["_last"] = df.get("last_name", "").fillna("").astype(str).apply(clean_text)
-        df["_name_grams"] = df["_clean_name"].apply(lambda s: ngrams(s, self.ngram_n))
-        df["_addr"] = (df.get("practice_address_line1","").fillna("") + " " +
-                       df.get("practice_city","").fillna("") + " " +
-                       df.get("practice_state","").fillna("")).astype(str).apply(clean_text)
-        df["_addr_grams"] = df["_addr"].apply(lambda s: ngrams(s, self.ngram_n))
-        df["_phone"] = df.get("practice_phone","").apply(extract_digits)
+        df["_clean_name"] = normalize_unique(df.get("full_name", "").fillna("").astype(str), clean_text)
+        df["_first"] = normalize_unique(df.get("first_name", "").fillna("").astype(str), clean_text)
+        df["_last"] = normalize_unique(df.get("last_name", "").fillna("").astype(str), clean_text)
+        df["_addr"] = normalize_unique((df.get("practice_address_line1","").fillna("") + " " +
+                                        df.get("practice_city","").fillna("") + " " +
+                                        df.get("practice_state","").fillna("")).astype(str), clean_text)
+        df["_phone"] = normalize_unique(df.get("practice_phone",""), extract_digits)
         df["_npi"] = df.get("npi","").fillna("").astype(str).str.strip()
         df["_license"] = (df.get("license_state","").fillna("").astype(str).str.upper() + "|" +
                           df.get("license_number","").fillna("").astype(str))
-        df["_city_state"] = (df.get("practice_city","").fillna("").astype(str).apply(clean_text) + "|" +
-                             df.get("practice_state","").fillna("").astype(str).apply(clean_text))
+        df["_city_state"] = (normalize_unique(df.get("practice_city","").fillna("").astype(str), clean_text, memo=True) + "|" +
+                             normalize_unique(df.get("practice_state","").fillna("").astype(str), clean_text, memo=True))
         df["_name_key"] = (df["_last"].str[:5].fillna("") + "_" + df["_first"].str[:2].fillna("")).apply(lambda s: s if s != "_" else "")
         df["_zip3"] = df.get("practice_zip","").fillna("").astype(str).str.extract(r"(\d{3})", expand=False).fillna("")
+        df["_street_no"] = df.get("practice_address_line1","").fillna("").astype(str).str.extract(r"^\s*(\d+)", expand=False).fillna("")
+        return self.add_gram_features(df)
+
+    def add_gram_features(self, df: pd.DataFrame) -> pd.DataFrame:
+        """n-gram sets of the cleaned name and address"""
+        to_grams = lambda s: ngrams(s, self.ngram_n)
+        df["_name_grams"] = normalize_unique(df["_clean_name"], to_grams)
+        df["_addr_grams"] = normalize_unique(df["_addr"], to_grams)
         return df
 
+    @staticmethod
+    def row_block_keys(row) -> List[str]:
+        """Blocking keys of one preprocessed row, apart from the sorted-neighbourhood window"""
+        keys = []
+        if row["_npi"]:
+            keys.append(f"npi:{row['_npi']}")
+        if row["_phone"]:
+            keys.append(f"phone7:{row['_phone'][-7:]}")
+            keys.append(f"phone3:{row['_phone'][:3]}")
+        if row["_license"] and row["_license"] != "|":
+            keys.append(f"lic:{row['_license']}")
+        if row["_zip3"]:
+            keys.append(f"zip:{row['_zip3']}")
+        if row["_city_state"] and row["_city_state"] != "|":
+            keys.append(f"cityst:{row['_city_state']}")
+        if row["_name_key"]:
+            keys.append(f"namekey:{row['_name_key']}")
+        if row["_zip3"] and row["_last"]:
+            keys.append(f"loose:{row['_zip3']}_{row['_last'][:3]}")
+        return keys
+
     def create_blocks(self, df: pd.DataFrame) -> Dict[str,List[int]]:
         blocks = defaultdict(set)
-        for idx, row in df.iterrows():
-            if row["_npi"]:
-                blocks[f"npi:{row['_npi']}"].add(idx)
-            if row["_phone"]:
-                blocks[f"phone7:{row['_phone'][-7:]}"].add(idx)
-                blocks[f"phone3:{row['_phone'][:3]}"].add(idx)
-            if row["_license"] and row["_license"] != "|":
-                blocks[f"lic:{row['_license']}"].add(idx)
-            if row["_zip3"]:
-                blocks[f"zip:{row['_zip3']}"].add(idx)
-            if row["_city_state"] and row["_city_state"] != "|":
-                blocks[f"cityst:{row['_city_state']}"].add(idx)
-            if row["_name_key"]:
-                blocks[f"namekey:{row['_name_key']}"].add(idx)
-            if row["_zip3"] and row["_last"]:
-                blocks[f"loose:{row['_zip3']}_{row['_last'][:3]}"].add(idx)
-        sorted_idx = df.sort_values("_last").index.tolist()
+        for idx, row in zip(df.index, df[BLOCK_KEY_COLUMNS].to_dict("records")):
+            for key in self.row_block_keys(row):
+                blocks[key].add(idx)
+        # Stable sort, so ties keep row order and the windows are reproducible out of core
+        sorted_idx = df.sort_values("_last", kind="stable").index.tolist()
         for i, idx in enumerate(sorted_idx):
-            blocks[f"sn:{i//40}"].add(idx)
-        return {k:list(v) for k,v in blocks.items() if self.min_block <= len(v) <= self.max_block}
+            blocks[f"sn:{i//SN_WINDOW}"].add(idx)
+        return self.size_blocks(blocks, df)
+
+    def size_blocks(self, blocks: Dict[str,Set[int]], df: pd.DataFrame,
+                    split_depths: Optional[Dict[str,int]] = None) -> Dict[str,List[int]]:
+        """
+        Split (or drop) blocks over max_block, drop blocks under min_block and record
+        block_stats. split_depths gives the secondary keys already applied to a block.
+        """
+        sized = {}
+        oversized = 0
+        for key, members in blocks.items():
+            if len(members) > self.max_block:
+                oversized += 1
+                if self.sub_block:
+                    depth = split_depths.get(key, 0) if split_depths else 0
+                    sized.update(self._split_block(key, sorted(members), df, depth))
+                    continue
+            sized[key] = list(members)
+        kept = {k:v for k,v in sized.items() if self.min_block <= len(v) <= self.max_block}
+        self.block_stats = {
+            "oversized_blocks": oversized,
+            "sub_blocks": sum(1 for k in kept if "/" in k),
+            "dropped_blocks": sum(1 for v in sized.values() if len(v) > self.max_block)
+        }
+        return kept
+
+    def _split_block(self, key: str, members: List[int], df: pd.DataFrame, depth: int = 0) -> Dict[str,List[int]]:
+        """Split an oversized block by the next secondary key until every part fits max_block;
+        parts still oversized once the keys run out are returned as-is and dropped by the caller"""
+        if len(members) <= self.max_block or depth >= len(SUB_BLOCK_KEYS):
+            return {key: members}
+        label, column, length = SUB_BLOCK_KEYS[depth]
+        values = df.loc[members, column]
+        if length:
+            values = values.str[:length]
+        groups = defaultdict(list)
+        for idx, value in zip(members, values):
+            groups[value].append(idx)
+        parts = {}
+        for value, group in groups.items():
+            parts.update(self._split_block(f"{key}/{label}:{value}", group, df, depth + 1))
+        return parts
 
     def candidate_pairs(self, blocks: Dict[str,List[int]]) -> Set[Tuple[int,int]]:
         pairs = set()
@@ -122,14 +270,24 @@ class DuplicateDetector:
         key = (min(i,j), max(i,j))
         if key in self._score_cache:
             return self._score_cache[key]
+        result = self._score_pair(ri, rj)
+        if self.cache_scores:
+            self._score_cache[key] = result
+        return result
+
+    def _score_pair(self, ri, rj) -> Tuple[float, Dict]:
+        """
+        Cascading scorer: the cheap components (name tokens, phone, license) come
+        first, and the n-gram Jaccards are skipped once an upper bound on the total,
+        taking every remaining component as a perfect match, cannot reach the
+        threshold. Pruned pairs get a score below the threshold and details
+        marked "pruned"; pairs that can reach it are scored exactly as before.
+        """
+        weights = SCORE_WEIGHTS
         name_tok = token_overlap(ri["_clean_name"], rj["_clean_name"])
         if name_tok < 0.2 and not (ri["_npi"] and rj["_npi"]) and not phone_match(ri["_phone"], rj["_phone"]):
-            self._score_cache[key] = (0.0, {"name":name_tok})
-            return self._score_cache[key]
-        name_big = jaccard(ri["_name_grams"], rj["_name_grams"])
-        name_score = max(name_tok, name_big)
+            return (0.0, {"name":name_tok, "pruned":"name"})
         npi_score = 1.0 if (ri["_npi"] and rj["_npi"] and ri["_npi"]==rj["_npi"]) else 0.0
-        addr_score = jaccard(ri["_addr_grams"], rj["_addr_grams"])
         phone_score = phone_match(ri["_phone"], rj["_phone"])
         lic_i, lic_j = ri.get("_license",""), rj.get("_license","")
         if lic_i and lic_j and lic_i==lic_j and lic_i!="|":
@@ -138,12 +296,25 @@ class DuplicateDetector:
             lic_score = 0.5
         else:
             lic_score = 0.0
-        weights = {"name":0.27, "npi":0.0, "addr":0.08, "phone":0.5, "license":0.15}
+        known = npi_score*weights["npi"] + phone_score*weights["phone"] + lic_score*weights["license"]
+        bound = known + weights["name"] + weights["addr"]
+        if self._below_threshold(bound):
+            return (round(bound,4), {"name":name_tok, "pruned":"bound"})
+        name_big = jaccard(ri["_name_grams"], rj["_name_grams"])
+        name_score = max(name_tok, name_big)
+        bound = known + name_score*weights["name"] + weights["addr"]
+        if self._below_threshold(bound):
+            return (round(bound,4), {"name":round(name_score,4), "pruned":"bound"})
+        addr_score = jaccard(ri["_addr_grams"], rj["_addr_grams"])
         scores = {"name":round(name_score,4), "npi":bool(npi_score), "addr":round(addr_score,4),
                   "phone":bool(phone_score), "license":round(lic_score,4)}
         total = name_score*weights["name"] + npi_score*weights["npi"] + addr_score*weights["addr"] + phone_score*weights["phone"] + lic_score*weights["license"]
-        self._score_cache[key] = (round(total,4), scores)
-        return self._score_cache[key]
+        return (round(total,4), scores)
+
+    def _below_threshold(self, bound: float) -> bool:
+        # Scores are rounded to 4 places before the threshold check, so the bound is too;
+        # the epsilon keeps float summation order from ever pruning a pair that could match
+        return self.prune and round(bound + 1e-9, 4) < self.threshold
 
     def _score_wrapper(self, args):
         i, j, ri, rj = args
@@ -154,79 +325,91 @@ class DuplicateDetector:
             "npi_match":details.get("npi",False),
             "addr_score":details.get("addr",0.0),
             "phone_match":details.get("phone",False),
-            "license_score":details.get("license",0.0)
+            "license_score":details.get("license",0.0),
+            "pruned":details.get("pruned")
         }
 
+    @staticmethod
+    def cluster_edges(edges: Iterable[Tuple[int,int]]) -> Dict[str,List[int]]:
+        """Union duplicate edges into clusters named after their root record"""
+        parent = {}
+        def find(x):
+            parent.setdefault(x,x)
+            if parent[x]!=x:
+                parent[x]=find(parent[x])
+            return parent[x]
+        def union(a,b):
+            ra,rb = find(a), find(b)
+            if ra!=rb:
+                parent[rb]=ra
+        for a, b in edges:
+            union(a, b)
+        clusters = defaultdict(list)
+        for node in parent.keys():
+            clusters[find(node)].append(node)
+        return {f"cluster_{k}": sorted(v) for k,v in clusters.items()}
+
+    @staticmethod
+    def representative_metric(idx, row) -> tuple:
+        """Cluster representative preference: has NPI, has license, most recently updated, lowest index"""
+        has_npi = 1 if row["_npi"] else 0
+        has_lic = 1 if row["_license"] and row["_license"]!="|" else 0
+        ts = 0
+        try:
+            ts = pd.to_datetime(row.get("last_updated", None)).value if row.get("last_updated") not in (None,"",np.nan) else 0
+        except:
+            ts = 0
+        return (has_npi, has_lic, ts, -idx)
+
     def detect(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame, Dict, Dict]:
         proc = self.preprocess(df)
         blocks = self.create_blocks(proc)
         pairs = self.candidate_pairs(blocks)
         if not pairs:
             deduped = proc.drop(columns=[c for c in proc.columns if c.startswith("_")])
-            summary = {"total_records":len(proc),"candidate_pairs":0,"duplicate_pairs":0,"unique_involved":0}
+            summary = {"total_records":len(proc),"candidate_pairs":0,"pruned_pairs":0,"name_filtered_pairs":0,"duplicate_pairs":0,"unique_involved":0}
             return pd.DataFrame([], columns=[]), deduped, {}, summary
-        args = [(i,j, proc.loc[i].to_dict(), proc.loc[j].to_dict()) for i,j in pairs]
+        records = proc.to_dict("index")
+        args = [(i,j, records[i], records[j]) for i,j in pairs]
         results = []
+        # Pairs cut short by the score bound ("bound") and by the name/NPI/phone filter ("name")
+        pruned = {"bound": 0, "name": 0}
         if self.parallel and len(args)>200:
             workers = max(1, min(cpu_count()-1, 8))
             with Pool(workers) as p:
                 for r in p.imap_unordered(self._score_wrapper, args, chunksize=256):
+                    if r["pruned"]:
+                        pruned[r["pruned"]] += 1
                     if r["score"] >= self.threshold:
                         results.append(r)
         else:
             for a in args:
                 r = self._score_wrapper(a)
+                if r["pruned"]:
+                    pruned[r["pruned"]] += 1
                 if r["score"] >= self.threshold:
                     results.append(r)
         dup_df = pd.DataFrame(results)
         if dup_df.empty:
             deduped = proc.drop(columns=[c for c in proc.columns if c.startswith("_")])
-            summary = {"total_records":len(proc),"candidate_pairs":len(args),"duplicate_pairs":0,"unique_involved":0}
+            summary = {"total_records":len(proc),"candidate_pairs":len(args),"pruned_pairs":pruned["bound"],"name_filtered_pairs":pruned["name"],"duplicate_pairs":0,"unique_involved":0}
             return dup_df, deduped, {}, summary
         dup_df = dup_df.merge(proc[["full_name","provider_id"]], left_on="i1", right_index=True).rename(columns={"full_name":"name_1","provider_id":"provider_id_1"})
         dup_df = dup_df.merge(proc[["full_name","provider_id"]], left_on="i2", right_index=True).rename(columns={"full_name":"name_2","provider_id":"provider_id_2"})
         dup_df = dup_df[["i1","i2","provider_id_1","provider_id_2","name_1","name_2","score","name_score","npi_match","addr_score","phone_match","license_score"]]
 
-        parent = {}
-        def find(x):
-            parent.setdefault(x,x)
-            if parent[x]!=x:
-                parent[x]=find(parent[x])
-            return parent[x]
-        def union(a,b):
-            ra,rb = find(a), find(b)
-            if ra!=rb:
-                parent[rb]=ra
-        for _, r in dup_df.iterrows():
-            union(int(r["i1"]), int(r["i2"]))
-        clusters = defaultdict(list)
-        for node in parent.keys():
-            clusters[find(node)].append(node)
-        clusters = {f"cluster_{k}": sorted(v) for k,v in clusters.items()}
-
-        reps = {}
-        for root, members in clusters.items():
-            best, best_score = None, (-1,-1,None,10**9)
-            for idx in members:
-                row = proc.loc[idx]
-                has_npi = 1 if row["_npi"] else 0
-                has_lic = 1 if row["_license"] and row["_license"]!="|" else 0
-                ts = 0
-                try:
-                    ts = pd.to_datetime(row.get("last_updated", None)).value if row.get("last_updated") not in (None,"",np.nan) else 0
-                except:
-                    ts = 0
-                metric = (has_npi, has_lic, ts, -idx)
-                if metric > best_score:
-                    best_score = metric
-                    best = idx
-            reps[root]=best
+        clusters = self.cluster_edges(zip(dup_df["i1"].astype(int), dup_df["i2"].astype(int)))
+        reps = {root: max(members, key=lambda idx: self.representative_metric(idx, proc.loc[idx]))
+                for root, members in clusters.items()}
         rep_indices = set(reps.values())
         deduped_df = proc.loc[sorted(rep_indices)].drop(columns=[c for c in proc.columns if c.startswith("_")]).reset_index(drop=True)
-        summary = {"total_records":len(proc),"candidate_pairs":len(args),"duplicate_pairs":len(dup_df),"unique_involved":len(set(dup_df["i1"]).union(set(dup_df["i2"]))),"clusters":len(clusters)}
+        summary = {"total_records":len(proc),"candidate_pairs":len(args),"pruned_pairs":pruned["bound"],"name_filtered_pairs":pruned["name"],"duplicate_pairs":len(dup_df),"unique_involved":len(set(dup_df["i1"]).union(set(dup_df["i2"]))),"clusters":len(clusters)}
         clusters_info = {k:{"members":v,"representative":reps[k]} for k,v in clusters.items()}
         return dup_df.reset_index(drop=True), deduped_df, clusters_info, summary
 
+# Duplicate score threshold used by preprocessing and the out-of-core batch mode
+DEDUP_THRESHOLD = 0.72
+
 def remove_duplicates(df, threshold=0.7, parallel=False):
     detector = DuplicateDetector(threshold=threshold, parallel=parallel)
     dup_df, _, clusters, summary = detector.detect(df)
@@ -240,6 +423,80 @@ def remove_duplicates(df, threshold=0.7, parallel=False):
     deduped_df = df.loc[sorted(rep_indices)].reset_index(drop=True)
     return dup_df, deduped_df, clusters, summary
 
+CLUSTER_TABLE_COLUMNS = [
+    "cluster_id", "member_index", "is_representative", "provider_id", "npi",
+    "full_name", "primary_specialty", "license_number", "license_state"
+]
+
+def build_cluster_table(clusters: Dict, roster_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Flattens cluster assignments into one row per member so they can be persisted.
+    member_index is the roster row index used by i1/i2 in dup_df; provider columns
+    are copied from the roster because non-representative members are dropped
+    from the merged roster.
+    """
+    roster = roster_df.reset_index(drop=True)
+    rows = []
+    for cluster_id, info in clusters.items():
+        for idx in info["members"]:
+            record = roster.loc[idx]
+            npi = pd.to_numeric(record.get("npi"), errors="coerce")
+            rows.append({
+                "cluster_id": cluster_id,
+                "member_index": int(idx),
+                "is_representative": idx == info["representative"],
+                "provider_id": record.get("provider_id"),
+                "npi": int(npi) if pd.notna(npi) else None,
+                "full_name": record.get("full_name"),
+                "primary_specialty": record.get("primary_specialty"),
+                "license_number": record.get("license_number"),
+                "license_state": record.get("license_state")
+            })
+    return pd.DataFrame(rows, columns=CLUSTER_TABLE_COLUMNS)
+
+CLUSTER_SUMMARY_COLUMNS = [
+    "cluster_id", "cluster_size", "pair_count", "max_score", "min_score",
+    "npi_match", "phone_match", "state"
+]
+
+def build_cluster_summary(clusters: Dict, dup_df: pd.DataFrame, roster_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    One row per cluster with the attributes the duplicates API filters and pages on.
+    state is the representative's practice state, falling back to its license state.
+    """
+    if not clusters or dup_df.empty:
+        return pd.DataFrame([], columns=CLUSTER_SUMMARY_COLUMNS)
+    member_cluster = {idx: cid for cid, info in clusters.items() for idx in info["members"]}
+    pair_stats = dup_df.assign(cluster_id=dup_df["i1"].map(member_cluster)).groupby("cluster_id").agg(
+        pair_count=("i1", "size"),
+        max_score=("score", "max"),
+        min_score=("score", "min"),
+        npi_match=("npi_match", "any"),
+        phone_match=("phone_match", "any")
+    )
+    roster = roster_df.reset_index(drop=True)
+    rows = []
+    for cluster_id, info in clusters.items():
+        rep = roster.loc[info["representative"]]
+        state = rep.get("practice_state")
+        if pd.isna(state) or state == "":
+            state = rep.get("license_state")
+        rows.append({
+            "cluster_id": cluster_id,
+            "cluster_size": len(info["members"]),
+            "state": state if pd.notna(state) and state != "" else None
+        })
+    summary_df = pd.DataFrame(rows).merge(pair_stats, left_on="cluster_id", right_index=True, how="left")
+    return summary_df[CLUSTER_SUMMARY_COLUMNS]
+
+def content_hash(df: pd.DataFrame) -> pd.Series:
+    """
+    64-bit hash of each row's values, ignoring the index. The hash key is fixed, so
+    the same row hashes the same in every process and on every load.
+    """
+    hashes = pd.util.hash_pandas_object(df, index=False)
+    return pd.Series(hashes.to_numpy().view(np.int64), index=df.index, name="row_hash")
+
 
 def standardize_df(df: pd.DataFrame) -> pd.DataFrame:
     """
@@ -250,39 +507,14 @@ def standardize_df(df: pd.DataFrame) -> pd.DataFrame:
       - rebuild full_name from first, last, credential
     """
 
+    # Normalizers return None for missing values; the standardized columns keep NaN
     # --- Standardize practice_phone ---
-    def normalize_phone(val):
-        if pd.isna(val):
-            return np.nan
-        digits = re.sub(r'\D+', '', str(val))
-        return digits if digits else np.nan
-
-    df['practice_phone'] = df['practice_phone'].apply(normalize_phone)
+    df['practice_phone'] = normalize_unique(df['practice_phone'], normalize_phone).fillna(np.nan)
 
     # --- Normalize mailing_zip ---
-    def normalize_zip(val):
-        if pd.isna(val):
-            return np.nan
-        s = str(val).strip()
-        digits = re.sub(r'\D+', '', s)
-        if digits == "":
-            return np.nan
-        if len(digits) < 5:
-            return digits.zfill(5)
-        if len(digits) == 5:
-            return digits
-        if len(digits) == 9:
-            return digits[:5] + "-" + digits[5:]
-        return digits
-
-    df['mailing_zip'] = df['mailing_zip'].apply(normalize_zip)
-
-    # --- Title case helper ---
-    def to_title(val):
-        if pd.isna(val):
-            return np.nan
-        return str(val).strip().title()
+    df['mailing_zip'] = normalize_unique(df['mailing_zip'], normalize_zip).fillna(np.nan)
 
+    # --- Title case ---
     title_cols = [
         'first_name', 'last_name',
         'practice_city', 'mailing_city',
@@ -292,7 +524,7 @@ def standardize_df(df: pd.DataFrame) -> pd.DataFrame:
     ]
     for col in title_cols:
         if col in df.columns:
-            df[col] = df[col].apply(to_title)
+            df[col] = normalize_unique(df[col], to_title, memo=col in MEMO_COLUMNS).fillna(np.nan)
 
     # --- Rebuild full_name ---
     def build_full_name(row):
@@ -346,12 +578,38 @@ def normalize_license(lic: Optional[str]) -> Optional[str]:
     s = s.replace("-", "").replace(" ", "")
     return s or None
 
+DATE_COLUMNS = ['license_expiration', 'last_updated']
+
+def normalize_date_columns(df: pd.DataFrame, columns: List[str] = DATE_COLUMNS) -> pd.DataFrame:
+    """Parse date columns to datetime64 so they can be stored as typed DATE columns"""
+    for col in columns:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors="coerce").dt.normalize()
+    return df
+
 def remove_outliers(df: pd.DataFrame, column: str = 'years_in_practice', min_val: int = 0, max_val: int = 60) -> pd.DataFrame:
     """Remove outliers from specified column"""
     if column not in df.columns:
         return df.copy()
     return df[(df[column] >= min_val) & (df[column] <= max_val)].copy()
 
+def is_valid_npi(val) -> bool:
+    return bool(re.match(r'^\d{10}$', str(val).strip()))
+
+def is_valid_phone(val) -> bool:
+    digits = normalize_phone(val)
+    return digits is not None and len(digits) == 10
+
+def is_valid_zip(val) -> bool:
+    zip_code = normalize_zip(val)
+    return zip_code is not None and bool(re.match(r'^\d{5}(-\d{4})?$', zip_code))
+
+def is_title_case(val) -> bool:
+    return str(val).strip() == to_title(val)
+
+def is_digits_only(val) -> bool:
+    return not re.search(r'[^\d]', str(val))
+
 class DataQualityAssessment:
     def __init__(self, df: pd.DataFrame):
         self.df = df.copy()
@@ -359,32 +617,15 @@ class DataQualityAssessment:
 
     def normalize_phone_check(self, val):
         """Normalize phone number - helper method for validation"""
-        if pd.isna(val):
-            return None
-        digits = re.sub(r'\D+', '', str(val))
-        return digits if digits else None
+        return normalize_phone(val)
 
     def normalize_zip_check(self, val):
         """Normalize zip code - helper method for validation"""
-        if pd.isna(val):
-            return None
-        s = str(val).strip()
-        digits = re.sub(r'\D+', '', s)
-        if digits == "":
-            return None
-        if len(digits) < 5:
-            return digits.zfill(5)
-        if len(digits) == 5:
-            return digits
-        if len(digits) == 9:
-            return digits[:5] + "-" + digits[5:]
-        return digits
+        return normalize_zip(val)
 
     def to_title_case(self, val):
         """Convert to title case - helper method for consistency check"""
-        if pd.isna(val):
-            return None
-        return str(val).strip().title()
+        return to_title(val)
 
     def assess_completeness(self) -> Dict:
         """Assess data completeness for critical fields"""
@@ -421,8 +662,7 @@ class DataQualityAssessment:
         if 'npi' in self.df.columns:
             npi_values = self.df['npi'].dropna()
             if len(npi_values) > 0:
-                valid_npi = sum(1 for npi in npi_values
-                              if re.match(r'^\d{10}$', str(npi).strip()))
+                valid_npi = int(normalize_unique(npi_values, is_valid_npi).sum())
                 total_valid_formats += valid_npi
                 total_format_checks += len(npi_values)
 
@@ -430,9 +670,7 @@ class DataQualityAssessment:
         if 'practice_phone' in self.df.columns:
             phone_values = self.df['practice_phone'].dropna()
             if len(phone_values) > 0:
-                valid_phone = sum(1 for phone in phone_values
-                                if self.normalize_phone_check(phone) is not None and
-                                len(self.normalize_phone_check(phone)) == 10)
+                valid_phone = int(normalize_unique(phone_values, is_valid_phone).sum())
                 total_valid_formats += valid_phone
                 total_format_checks += len(phone_values)
 
@@ -442,9 +680,7 @@ class DataQualityAssessment:
             if col in self.df.columns:
                 zip_values = self.df[col].dropna()
                 if len(zip_values) > 0:
-                    valid_zip = sum(1 for zip_code in zip_values
-                                  if self.normalize_zip_check(zip_code) is not None and
-                                  re.match(r'^\d{5}(-\d{4})?$', self.normalize_zip_check(zip_code)))
+                    valid_zip = int(normalize_unique(zip_values, is_valid_zip).sum())
                     total_valid_formats += valid_zip
                     total_format_checks += len(zip_values)
 
@@ -475,8 +711,7 @@ class DataQualityAssessment:
             if col in self.df.columns:
                 col_values = self.df[col].dropna()
                 if len(col_values) > 0:
-                    consistent_count = sum(1 for val in col_values
-                                         if str(val).strip() == self.to_title_case(val))
+                    consistent_count = int(normalize_unique(col_values, is_title_case, memo=col in MEMO_COLUMNS).sum())
                     total_consistent += consistent_count
                     total_consistency_checks += len(col_values)
 
@@ -484,8 +719,7 @@ class DataQualityAssessment:
         if 'practice_phone' in self.df.columns:
             phone_values = self.df['practice_phone'].dropna()
             if len(phone_values) > 0:
-                consistent_phone = sum(1 for phone in phone_values
-                                     if not re.search(r'[^\d]', str(phone)))
+                consistent_phone = int(normalize_unique(phone_values, is_digits_only).sum())
                 total_consistent += consistent_phone
                 total_consistency_checks += len(phone_values)
 
@@ -609,26 +843,149 @@ def calculate_data_quality_score(df: pd.DataFrame, summary: Dict = None) -> Tupl
     assessor = DataQualityAssessment(df)
     return assessor.calculate_overall_quality_score(summary)
 
-def merge_roster(df_clean: pd.DataFrame, base_path: str) -> pd.DataFrame:
-    files = {
-        "ca": os.path.join(base_path, "ca.csv"),
-        "ny": os.path.join(base_path, "ny.csv"),
-        "npi": os.path.join(base_path, "npi.csv")
-    }
+# File extension -> table format understood by read_table / write_table
+TABLE_FORMATS = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+    ".ipc": "arrow",
+}
+
+
+def table_format(name: str) -> str:
+    """Table format for a file name, CSV when the extension is unknown"""
+    return TABLE_FORMATS.get(os.path.splitext(name)[1].lower(), "csv")
+
+
+def read_table(source, fmt: Optional[str] = None, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Read a CSV, Parquet or Arrow IPC (Feather v2) table from a path or raw bytes.
+    With `columns`, only those that exist in the file are loaded; Parquet and Arrow
+    skip the other columns entirely, and Arrow files are memory-mapped.
+    """
+    if fmt is None:
+        fmt = table_format(source) if isinstance(source, str) else "csv"
+
+    if fmt == "csv":
+        buffer = io.BytesIO(source) if isinstance(source, bytes) else source
+        if columns is None:
+            return pd.read_csv(buffer)
+        wanted = set(columns)
+        return pd.read_csv(buffer, usecols=lambda c: c in wanted)
+
+    # pyarrow is only needed for Parquet/Arrow inputs
+    import pyarrow as pa
+    if isinstance(source, bytes):
+        source = pa.BufferReader(source)
+    elif fmt == "arrow":
+        source = pa.memory_map(source)
+
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(source)
+        names = parquet_file.schema_arrow.names
+        table = parquet_file.read(columns=[c for c in columns if c in names] if columns is not None else None)
+    elif fmt == "arrow":
+        try:
+            table = pa.ipc.open_file(source).read_all()
+        except pa.ArrowInvalid:
+            # Arrow IPC stream rather than file format
+            source.seek(0)
+            table = pa.ipc.open_stream(source).read_all()
+        if columns is not None:
+            table = table.select([c for c in columns if c in table.schema.names])
+    else:
+        raise ValueError(f"Unsupported table format: {fmt}")
+    return table.to_pandas()
+
+
+def write_table(df: pd.DataFrame, path: str) -> None:
+    """Write a DataFrame as CSV, Parquet or Arrow IPC depending on the file extension"""
+    fmt = table_format(path)
+    if fmt == "parquet":
+        df.to_parquet(path, index=False)
+    elif fmt == "arrow":
+        df.reset_index(drop=True).to_feather(path)
+    else:
+        df.to_csv(path, index=False)
+
 
-    tables = {k: pd.read_csv(p) for k, p in files.items() if os.path.exists(p)}
+# Reference tables for merge_roster, the columns it uses from each, and the file
+# extensions tried in order (columnar formats first, they load without parsing)
+REFERENCE_COLUMNS = {
+    "ca": ["license_number", "status"],
+    "ny": ["license_number", "expiration_date", "status"],
+    "npi": ["npi"],
+}
+REFERENCE_EXTENSIONS = [".parquet", ".arrow", ".feather", ".csv"]
+
+
+def find_reference_file(base_path: str, name: str) -> Optional[str]:
+    """
+    First of <name>.parquet, .arrow, .feather or .csv that exists. A columnar copy older
+    than the CSV is skipped, so edits to the CSV take effect without regenerating it.
+    """
+    paths = [os.path.join(base_path, name + ext) for ext in REFERENCE_EXTENSIONS]
+    paths = [path for path in paths if os.path.exists(path)]
+    csv_path = os.path.join(base_path, name + ".csv")
+    if csv_path in paths:
+        csv_mtime = os.stat(csv_path).st_mtime_ns
+        paths = [path for path in paths if path == csv_path or os.stat(path).st_mtime_ns >= csv_mtime]
+    return paths[0] if paths else None
+
+# base_path -> (file signature, parsed reference data)
+_reference_cache: Dict[str, Tuple[tuple, Dict]] = {}
+
+
+def load_reference_data(base_path: str) -> Dict:
+    """
+    State license tables with normalized keys and the set of known NPIs, read from
+    <name>.parquet, .arrow, .feather or .csv (see find_reference_file) with only the
+    columns merge_roster uses.
+    Parsed once per base_path and re-read only when a file's mtime or size changes.
+    """
+    paths = {name: find_reference_file(base_path, name) for name in REFERENCE_COLUMNS}
+    signature = tuple(
+        (p, os.stat(p).st_mtime_ns, os.stat(p).st_size) if p is not None else None
+        for p in paths.values()
+    )
+    cached = _reference_cache.get(base_path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    tables = {k: read_table(p, columns=REFERENCE_COLUMNS[k]) for k, p in paths.items() if p is not None}
     ca_df = tables.get("ca", pd.DataFrame())
     ny_df = tables.get("ny", pd.DataFrame())
     npi_df = tables.get("npi", pd.DataFrame())
 
-    df_clean['license_number_norm'] = df_clean['license_number'].apply(normalize_license)
     if not ca_df.empty:
-        ca_df['license_number_norm'] = ca_df['license_number'].apply(normalize_license)
+        ca_df['license_number_norm'] = normalize_unique(ca_df['license_number'], normalize_license)
+    if not ny_df.empty:
+        ny_df['license_number_norm'] = normalize_unique(ny_df['license_number'], normalize_license)
+        ny_df['expiration_date_norm'] = normalize_unique(ny_df['expiration_date'], normalize_datetime)
+
+    npi_set = None
+    if not npi_df.empty and 'npi' in npi_df.columns:
+        # Set of NPIs from npi.csv for fast lookup
+        npi_set = set(normalize_unique(npi_df['npi'], normalise_npi).dropna())
+
+    reference = {"ca": ca_df, "ny": ny_df, "npi_set": npi_set}
+    _reference_cache[base_path] = (signature, reference)
+    return reference
+
+
+def merge_roster(df_clean: pd.DataFrame, base_path: str) -> pd.DataFrame:
+    reference = load_reference_data(base_path)
+    ca_df = reference["ca"]
+    ny_df = reference["ny"]
+    npi_set = reference["npi_set"]
+
+    df_clean['license_number_norm'] = normalize_unique(df_clean['license_number'], normalize_license)
     if not ny_df.empty:
-        ny_df['license_number_norm'] = ny_df['license_number'].apply(normalize_license)
-        ny_df['expiration_date_norm'] = ny_df['expiration_date'].apply(normalize_datetime)
         if 'license_expiration' in df_clean.columns:
-            df_clean['license_expiration_norm'] = df_clean['license_expiration'].apply(normalize_datetime)
+            df_clean['license_expiration_norm'] = normalize_unique(df_clean['license_expiration'], normalize_datetime)
 
     merged_parts = []
 
@@ -676,14 +1033,9 @@ def merge_roster(df_clean: pd.DataFrame, base_path: str) -> pd.DataFrame:
         merged_df.drop(columns=['ny_status'], errors='ignore', inplace=True)
 
     # NEW LOGIC: Check if NPI exists in npi.csv and create npi_present column
-    if not npi_df.empty and 'npi' in npi_df.columns:
-        # Create a set of NPIs from npi.csv for fast lookup
-        npi_set = set(npi_df['npi'].apply(normalise_npi).dropna())
-
+    if npi_set is not None:
         # Check each row in merged_df if its NPI exists in npi.csv
-        merged_df['npi_present'] = merged_df['npi'].apply(
-            lambda x: normalise_npi(x) in npi_set if normalise_npi(x) is not None else False
-        )
+        merged_df['npi_present'] = normalize_unique(merged_df['npi'], normalise_npi).isin(npi_set)
     else:
         # If npi.csv doesn't exist or doesn't have 'npi' column, set all to False
         merged_df['npi_present'] = False
@@ -765,9 +1117,10 @@ def create_comprehensive_summary(summary: dict, df_merged: pd.DataFrame, origina
     return summary
 
 
-def preprocessing(roster_df: pd.DataFrame, base_path: str, remove_outliers_flag: bool = True) -> Tuple[pd.DataFrame, dict, dict, pd.DataFrame]:
+def preprocessing(roster_df, base_path: str, remove_outliers_flag: bool = True) -> Tuple[pd.DataFrame, dict, dict, pd.DataFrame]:
     """
-    Complete preprocessing pipeline with integrated summary creation
+    Complete preprocessing pipeline with integrated summary creation.
+    roster_df may be a DataFrame or the path of a CSV, Parquet or Arrow roster file.
 
     Returns:
         dup_df: DataFrame with duplicate pairs information
@@ -775,11 +1128,14 @@ def preprocessing(roster_df: pd.DataFrame, base_path: str, remove_outliers_flag:
         summary: Comprehensive summary dictionary with all metrics
         merged_df: Final processed and merged DataFrame
     """
+    if isinstance(roster_df, str):
+        roster_df = read_table(roster_df)
+
     # Store original dataframe for quality assessment
     original_df = roster_df.copy()
 
     # Step 1: Remove duplicates
-    dup_df, deduped_df, clusters, summary = remove_duplicates(roster_df, threshold=0.72)
+    dup_df, deduped_df, clusters, summary = remove_duplicates(roster_df, threshold=DEDUP_THRESHOLD)
 
     # Step 2: Standardize data
     df_clean = standardize_df(deduped_df)
@@ -796,7 +1152,470 @@ def preprocessing(roster_df: pd.DataFrame, base_path: str, remove_outliers_flag:
     else:
         summary["outliers_removed"] = 0
 
-    # Step 5: Create comprehensive summary with all metrics
+    # Step 5: Parse dates so they are stored as typed columns
+    merged_df = normalize_date_columns(merged_df)
+
+    # Step 6: Create comprehensive summary with all metrics
     summary = create_comprehensive_summary(summary, merged_df, original_df)
 
-    return dup_df, clusters, summary, merged_df
\ No newline at end of file
+    return dup_df, clusters, summary, merged_df
+
+def iter_table_chunks(path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Stream a CSV, Parquet or Arrow table as DataFrames of at most chunk_size rows"""
+    fmt = table_format(path)
+    if fmt == "csv":
+        yield from pd.read_csv(path, chunksize=chunk_size)
+        return
+
+    import pyarrow as pa
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        batches = pq.ParquetFile(path).iter_batches(batch_size=chunk_size)
+    else:
+        source = pa.memory_map(path)
+        try:
+            reader = pa.ipc.open_file(source)
+            batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+        except pa.ArrowInvalid:
+            source.seek(0)
+            batches = pa.ipc.open_stream(source)
+    for batch in batches:
+        for offset in range(0, batch.num_rows, chunk_size):
+            yield batch.slice(offset, chunk_size).to_pandas()
+
+
+# Columns each partition row carries, so a partition is scored without looking rows up elsewhere
+PARTITION_COLUMNS = [
+    "_clean_name", "_first", "_last", "_addr", "_phone", "_npi", "_license", "_street_no",
+    "full_name", "provider_id", "last_updated"
+]
+
+
+class _PartitionWriter:
+    """Buffers keyed feature rows and spills them to Parquet files, one directory per partition"""
+
+    def __init__(self, root: str, partitions: int, buffer_rows: int, salt: str = ""):
+        self.root = root
+        self.partitions = partitions
+        self.buffer_rows = buffer_rows
+        self.salt = salt
+        self._buffers: Dict[int, List[pd.DataFrame]] = defaultdict(list)
+        self._buffered = 0
+        self._spills = 0
+        for partition in range(partitions):
+            os.makedirs(self.partition_dir(partition), exist_ok=True)
+
+    def partition_dir(self, partition: int) -> str:
+        return os.path.join(self.root, f"partition-{partition:04d}")
+
+    def write(self, rows: pd.DataFrame) -> None:
+        if rows.empty:
+            return
+        # crc32 rather than hash(): stable across processes and runs
+        partition_of = rows["_key"].map(lambda key: zlib.crc32((self.salt + key).encode()) % self.partitions)
+        for partition, part in rows.groupby(partition_of):
+            self._buffers[partition].append(part)
+        self._buffered += len(rows)
+        if self._buffered >= self.buffer_rows:
+            self.flush()
+
+    def partition_dirs(self) -> List[str]:
+        return [self.partition_dir(partition) for partition in range(self.partitions)]
+
+    def flush(self) -> None:
+        for partition, parts in self._buffers.items():
+            path = os.path.join(self.partition_dir(partition), f"spill-{self._spills:06d}.parquet")
+            write_table(pd.concat(parts, ignore_index=True), path)
+        self._spills += 1
+        self._buffers.clear()
+        self._buffered = 0
+
+
+class OutOfCoreDeduplicator:
+    """
+    Duplicate detection for rosters larger than memory, with the same blocking and
+    scoring as DuplicateDetector. The roster is streamed in chunks; every row's blocking
+    keys are written with its scoring features to on-disk partitions chosen by key hash,
+    so each block lands whole in one partition. Sorted-neighbourhood windows come from an
+    external merge sort of per-chunk runs. Each partition is then scored on its own and
+    only the duplicate edges are kept, to be merged into global clusters at the end.
+
+    Memory is bounded by chunk_size, buffer_rows and max_partition_rows, not by the
+    roster size. A partition over max_partition_rows is streamed into `partitions`
+    sub-partitions under a different hash before it is loaded, with oversized blocks
+    sub-blocked on disk, so a partition's candidate pairs stay under
+    max_partition_rows * max_block / 2 (8 bytes each). A pair that shares blocks in
+    two partitions is scored in both, so candidate_pairs can count it twice.
+    """
+
+    # Re-partitioning rounds (one plain re-hash, then one per secondary key) before an oversized partition is loaded anyway
+    MAX_REPARTITION_DEPTH = 2 + len(SUB_BLOCK_KEYS)
+    # Rows per Parquet row group in the sorted runs
+    RUN_ROW_GROUP = 1000
+    # Candidate pairs unpacked and scored at a time
+    PAIR_BATCH = 100_000
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD, chunk_size: int = 100_000, partitions: int = 64,
+                 max_partition_rows: int = 500_000, buffer_rows: int = 200_000, work_dir: Optional[str] = None,
+                 **detector_options):
+        # Pairs are unique within a partition, so caching scores would only hold memory
+        self.detector = DuplicateDetector(threshold=threshold, cache_scores=False, **detector_options)
+        self.chunk_size = int(chunk_size)
+        self.partitions = int(partitions)
+        self.max_partition_rows = int(max_partition_rows)
+        self.buffer_rows = int(buffer_rows)
+        self.work_dir = work_dir
+
+    def detect(self, path: str, deduped_dir: Optional[str] = None, output_format: str = "csv") -> Tuple[pd.DataFrame, Dict, Dict]:
+        """
+        Returns the duplicate pairs, clusters and a summary like DuplicateDetector.detect.
+        With deduped_dir, the roster minus non-representative cluster members is written
+        there as one part-NNNNN.<output_format> file per chunk.
+        """
+        with tempfile.TemporaryDirectory(prefix="dedup-", dir=self.work_dir) as work:
+            writer = _PartitionWriter(os.path.join(work, "partitions"), self.partitions, self.buffer_rows)
+            total, runs = self._write_partitions(path, work, writer)
+            self._write_sorted_neighbourhood(runs, writer)
+            writer.flush()
+            edges, nodes, stats = self._score_partitions(writer)
+
+        dup_df = pd.DataFrame(
+            [edges[key] for key in sorted(edges)],
+            columns=["i1","i2","provider_id_1","provider_id_2","name_1","name_2","score","name_score","npi_match","addr_score","phone_match","license_score"]
+        )
+        clusters = DuplicateDetector.cluster_edges(sorted(edges))
+        reps = {root: max(members, key=lambda idx: nodes[idx]) for root, members in clusters.items()}
+        clusters_info = {k:{"members":v,"representative":reps[k]} for k,v in clusters.items()}
+        if deduped_dir is not None:
+            removed = set().union(*(c["members"] for c in clusters_info.values())) - set(reps.values())
+            self._write_deduped(path, removed, deduped_dir, output_format)
+
+        summary = {"total_records":total, "candidate_pairs":stats["candidate_pairs"], "pruned_pairs":stats["pruned_pairs"],
+                   "name_filtered_pairs":stats["name_filtered_pairs"], "duplicate_pairs":len(dup_df), "unique_involved":len(nodes), "clusters":len(clusters),
+                   "partitions":stats["partitions"], "largest_partition_rows":stats["largest_partition_rows"]}
+        return dup_df, clusters_info, summary
+
+    def _write_partitions(self, path: str, work: str, writer: _PartitionWriter) -> Tuple[int, List[str]]:
+        """Pass 1: preprocess each chunk, spill its keyed rows and write its rows sorted by last name as a run"""
+        os.makedirs(os.path.join(work, "runs"))
+        runs = []
+        offset = 0
+        for chunk_no, chunk in enumerate(iter_table_chunks(path, self.chunk_size)):
+            proc = self.detector.preprocess(chunk)
+            # The normalization memo would otherwise grow with the roster
+            clear_normalize_memo()
+            proc.index = pd.RangeIndex(offset, offset + len(proc), name="_idx")
+            offset += len(proc)
+            features = proc.reindex(columns=PARTITION_COLUMNS)
+            keys = [(key, idx) for idx, row in zip(proc.index, proc[BLOCK_KEY_COLUMNS].to_dict("records"))
+                    for key in self.detector.row_block_keys(row)]
+            writer.write(pd.DataFrame(keys, columns=["_key", "_idx"]).assign(_split=0).join(features, on="_idx"))
+
+            run = os.path.join(work, "runs", f"run-{chunk_no:06d}.parquet")
+            # Small row groups, so the merge holds one group per run rather than whole runs
+            features.sort_values("_last", kind="stable").reset_index().to_parquet(run, index=False, row_group_size=self.RUN_ROW_GROUP)
+            runs.append(run)
+        return offset, runs
+
+    def _write_sorted_neighbourhood(self, runs: List[str], writer: _PartitionWriter) -> None:
+        """Pass 2: merge the sorted runs and assign each row its window in global last-name order"""
+        import pyarrow.parquet as pq
+        batch_rows = self.RUN_ROW_GROUP
+
+        def read_run(run: str) -> Iterator[dict]:
+            for batch in pq.ParquetFile(run).iter_batches(batch_size=batch_rows):
+                yield from batch.to_pandas().to_dict("records")
+
+        # Ties on last name are broken by row index, matching the stable in-memory sort
+        merged = heapq.merge(*(read_run(run) for run in runs), key=lambda row: (row["_last"], row["_idx"]))
+        buffer = []
+        for rank, row in enumerate(merged):
+            row["_key"] = f"sn:{rank//SN_WINDOW}"
+            row["_split"] = 0
+            buffer.append(row)
+            if len(buffer) >= batch_rows:
+                writer.write(pd.DataFrame(buffer))
+                buffer = []
+        writer.write(pd.DataFrame(buffer))
+
+    def _score_partitions(self, writer: _PartitionWriter) -> Tuple[Dict, Dict, Dict]:
+        """Pass 3: block and score each partition independently, keeping only duplicate edges"""
+        detector = self.detector
+        edges: Dict[Tuple[int,int], Dict] = {}
+        nodes: Dict[int, tuple] = {}
+        stats = {"candidate_pairs": 0, "pruned_pairs": 0, "name_filtered_pairs": 0, "partitions": 0, "largest_partition_rows": 0}
+        pending = [(directory, 0) for directory in writer.partition_dirs()]
+        while pending:
+            directory, depth = pending.pop()
+            spills = sorted(glob.glob(os.path.join(directory, "*.parquet")))
+            if not spills:
+                continue
+            if depth < self.MAX_REPARTITION_DEPTH and self._count_rows(spills) > self.max_partition_rows:
+                pending.extend((sub_dir, depth + 1) for sub_dir in self._repartition(directory, spills, depth + 1))
+                continue
+            stats["partitions"] += 1
+            part = pd.concat([read_table(spill) for spill in spills], ignore_index=True)
+            stats["largest_partition_rows"] = max(stats["largest_partition_rows"], len(part))
+            features = detector.add_gram_features(part.drop_duplicates("_idx").set_index("_idx"))
+            clear_normalize_memo()
+
+            blocks = defaultdict(set)
+            for key, idx in zip(part["_key"], part["_idx"].tolist()):
+                blocks[key].add(idx)
+            split = part.loc[part["_split"] > 0].drop_duplicates("_key")
+            split_depths = dict(zip(split["_key"], split["_split"].tolist()))
+            del part, split
+            pairs = self._unique_pairs(detector.size_blocks(blocks, features, split_depths))
+            del blocks
+            records = features.to_dict("index")
+            stats["candidate_pairs"] += len(pairs)
+            # Unpacked to Python ints a slice at a time; the whole array as a list would cost ~100 bytes a pair
+            for start in range(0, len(pairs), self.PAIR_BATCH):
+                batch = pairs[start:start + self.PAIR_BATCH]
+                for i, j in zip((batch >> 32).tolist(), (batch & 0xFFFFFFFF).tolist()):
+                    r = detector._score_wrapper((i, j, records[i], records[j]))
+                    if r["pruned"]:
+                        stats["pruned_pairs" if r["pruned"] == "bound" else "name_filtered_pairs"] += 1
+                    if r["score"] < detector.threshold or (i, j) in edges:
+                        continue
+                    del r["pruned"]
+                    r.update({"provider_id_1":records[i]["provider_id"], "provider_id_2":records[j]["provider_id"],
+                              "name_1":records[i]["full_name"], "name_2":records[j]["full_name"]})
+                    edges[(i, j)] = r
+                    for idx in (i, j):
+                        nodes[idx] = detector.representative_metric(idx, records[idx])
+        return edges, nodes, stats
+
+    @staticmethod
+    def _unique_pairs(blocks: Dict[str,List[int]]) -> np.ndarray:
+        """
+        A partition's candidate pairs, the same as candidate_pairs(), each packed into
+        one int64 as (i << 32) | j (row indexes stay below 2**32): 8 bytes per pair
+        instead of about a hundred for a tuple in a set.
+        """
+        codes = []
+        for members in blocks.values():
+            if len(members) < 2:
+                continue
+            members = np.sort(np.asarray(members, dtype=np.int64))
+            first, second = np.triu_indices(len(members), k=1)
+            codes.append((members[first] << 32) | members[second])
+        if not codes:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(codes))
+
+    @staticmethod
+    def _count_rows(spills: List[str]) -> int:
+        import pyarrow.parquet as pq
+        return sum(pq.ParquetFile(spill).metadata.num_rows for spill in spills)
+
+    def _repartition(self, directory: str, spills: List[str], depth: int) -> List[str]:
+        """
+        Stream an oversized partition into sub-partitions under a new hash, one spill file
+        at a time. After the first round, blocks over max_block are also re-keyed to their
+        next sub-block, splitting them on disk exactly as _split_block would in memory, so
+        a single huge block is spread out too; blocks with no secondary key left are
+        dropped, as they would be in memory.
+        """
+        oversized = self._oversized_keys(spills) if depth > 1 else set()
+        writer = _PartitionWriter(os.path.join(directory, "sub"), self.partitions, self.buffer_rows, salt=f"{depth}:")
+        for spill in spills:
+            rows = read_table(spill)
+            writer.write(self._split_oversized(rows, oversized) if oversized else rows)
+            os.remove(spill)
+        writer.flush()
+        return writer.partition_dirs()
+
+    def _oversized_keys(self, spills: List[str]) -> Set[str]:
+        sizes = defaultdict(int)
+        for spill in spills:
+            for key, size in read_table(spill, columns=["_key"])["_key"].value_counts().items():
+                sizes[key] += size
+        return {key for key, size in sizes.items() if size > self.detector.max_block}
+
+    def _split_oversized(self, rows: pd.DataFrame, oversized: Set[str]) -> pd.DataFrame:
+        big = rows["_key"].isin(oversized)
+        if not big.any():
+            return rows
+        parts = [rows[~big]]
+        if self.detector.sub_block:
+            for depth, group in rows[big].groupby("_split"):
+                if depth >= len(SUB_BLOCK_KEYS):
+                    continue
+                label, column, length = SUB_BLOCK_KEYS[depth]
+                values = group[column].fillna("").astype(str)
+                if length:
+                    values = values.str[:length]
+                parts.append(group.assign(_key=group["_key"] + f"/{label}:" + values, _split=depth + 1))
+        return pd.concat(parts, ignore_index=True)
+
+    def _write_deduped(self, path: str, removed: Set[int], deduped_dir: str, output_format: str) -> None:
+        """Pass 4: stream the roster again, leaving out non-representative cluster members"""
+        os.makedirs(deduped_dir, exist_ok=True)
+        offset = 0
+        for chunk_no, chunk in enumerate(iter_table_chunks(path, self.chunk_size)):
+            chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+            offset += len(chunk)
+            kept = chunk[~chunk.index.isin(removed)]
+            write_table(kept, os.path.join(deduped_dir, f"part-{chunk_no:05d}.{output_format}"))
+
+
+def _json_default(value):
+    """JSON encoder fallback for NumPy scalars and timestamps in summaries"""
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    if isinstance(value, np.bool_):
+        return bool(value)
+    return str(value)
+
+
+def roster_output_name(path: str) -> str:
+    """Prefix of a roster file's outputs: its base name without the extension"""
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def process_roster_file(path: str, reference_path: str, output_dir: str, output_format: str = "csv") -> Dict:
+    """
+    Run preprocessing on one roster file (CSV, Parquet or Arrow) and write
+    <name>_duplicates.<ext>, <name>_merged.<ext> and <name>_summary.json to output_dir.
+    Returns per-file stats; failures are reported instead of raised so one bad file
+    doesn't stop a batch.
+    """
+    name = roster_output_name(path)
+    start = time.perf_counter()
+    try:
+        roster_df = read_table(path)
+        dup_df, clusters, summary, merged_df = preprocessing(roster_df, reference_path)
+
+        write_table(dup_df, os.path.join(output_dir, f"{name}_duplicates.{output_format}"))
+        write_table(merged_df, os.path.join(output_dir, f"{name}_merged.{output_format}"))
+        with open(os.path.join(output_dir, f"{name}_summary.json"), "w") as f:
+            json.dump({"clusters": clusters, "summary": summary}, f, indent=2, default=_json_default)
+
+        seconds = time.perf_counter() - start
+        return {"file": path, "rows": len(roster_df), "seconds": seconds, "rows_per_second": len(roster_df) / seconds if seconds else 0.0}
+    except Exception as e:
+        return {"file": path, "error": f"{type(e).__name__}: {e}", "seconds": time.perf_counter() - start}
+
+
+def _process_roster_task(args: Tuple[str, str, str, str]) -> Dict:
+    return process_roster_file(*args)
+
+
+def deduplicate_roster_file(path: str, output_dir: str, output_format: str = "csv", chunk_size: int = 100_000,
+                            partitions: int = 64, max_partition_rows: int = 500_000, work_dir: Optional[str] = None) -> Dict:
+    """
+    Out-of-core deduplication of one roster file: writes <name>_duplicates.<ext>,
+    the deduplicated roster as <name>_deduped/part-NNNNN.<ext> and <name>_summary.json.
+    Standardization and the reference merge need the whole roster and are not run.
+    """
+    name = roster_output_name(path)
+    start = time.perf_counter()
+    try:
+        deduplicator = OutOfCoreDeduplicator(
+            chunk_size=chunk_size, partitions=partitions, max_partition_rows=max_partition_rows, work_dir=work_dir
+        )
+        dup_df, clusters, summary = deduplicator.detect(
+            path, deduped_dir=os.path.join(output_dir, f"{name}_deduped"), output_format=output_format
+        )
+
+        write_table(dup_df, os.path.join(output_dir, f"{name}_duplicates.{output_format}"))
+        with open(os.path.join(output_dir, f"{name}_summary.json"), "w") as f:
+            json.dump({"clusters": clusters, "summary": summary}, f, indent=2, default=_json_default)
+
+        rows = summary["total_records"]
+        seconds = time.perf_counter() - start
+        return {"file": path, "rows": rows, "seconds": seconds, "rows_per_second": rows / seconds if seconds else 0.0}
+    except Exception as e:
+        return {"file": path, "error": f"{type(e).__name__}: {e}", "seconds": time.perf_counter() - start}
+
+
+def _deduplicate_roster_task(args: Tuple) -> Dict:
+    return deduplicate_roster_file(*args)
+
+
+def find_roster_files(inputs: List[str]) -> List[str]:
+    """Expand directories (their CSV, Parquet and Arrow files) and glob patterns into a sorted, de-duplicated file list"""
+    files = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            for ext in TABLE_FORMATS:
+                files.update(os.path.normpath(p) for p in glob.glob(os.path.join(item, f"*{ext}")))
+        else:
+            files.update(os.path.normpath(p) for p in glob.glob(item) if os.path.isfile(p))
+    return sorted(files)
+
+
+def output_name_collisions(files: List[str]) -> Dict[str, List[str]]:
+    """Output names shared by several input files, e.g. x.csv and x.parquet, or x.csv in two directories"""
+    by_name = defaultdict(list)
+    for path in files:
+        by_name[roster_output_name(path)].append(path)
+    return {name: paths for name, paths in by_name.items() if len(paths) > 1}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m pipeline",
+        description="Deduplicate, standardize and merge roster files in batch, one output set per input file."
+    )
+    parser.add_argument("inputs", nargs="+", help="roster files (CSV, Parquet, Arrow), directories of them or glob patterns")
+    parser.add_argument("--reference", help="directory with the ca, ny and npi reference files (.parquet, .arrow, .feather or .csv)")
+    parser.add_argument("--output", required=True, help="directory for the per-file outputs")
+    parser.add_argument("--format", choices=["csv", "parquet", "arrow"], default="csv", help="format of the duplicates and merged outputs")
+    parser.add_argument("--workers", type=int, default=max(1, cpu_count() - 1), help="parallel processes (default: CPUs - 1)")
+    parser.add_argument("--out-of-core", action="store_true",
+                        help="deduplicate only, streaming each roster through disk partitions so it need not fit in memory")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="rows read at a time in --out-of-core mode")
+    parser.add_argument("--partitions", type=int, default=64, help="disk partitions (and sub-partitions) in --out-of-core mode")
+    parser.add_argument("--max-partition-rows", type=int, default=500_000,
+                        help="partitions larger than this are split again before scoring in --out-of-core mode")
+    parser.add_argument("--work-dir", help="directory for --out-of-core partition files (default: system temp directory)")
+    args = parser.parse_args(argv)
+
+    if not args.out_of_core and not args.reference:
+        parser.error("--reference is required unless --out-of-core is given")
+    files = find_roster_files(args.inputs)
+    if not files:
+        parser.error("no roster files matched the given inputs")
+    # Outputs are named after the input's base name, so these files would overwrite each other's
+    collisions = output_name_collisions(files)
+    if collisions:
+        parser.error("input files share an output name: " + "; ".join(
+            f"{name} <- {', '.join(paths)}" for name, paths in sorted(collisions.items())
+        ))
+    os.makedirs(args.output, exist_ok=True)
+
+    workers = max(1, min(args.workers, len(files)))
+    print(f"Processing {len(files)} file(s) with {workers} worker(s)")
+    if args.out_of_core:
+        task = _deduplicate_roster_task
+        tasks = [(path, args.output, args.format, args.chunk_size, args.partitions, args.max_partition_rows, args.work_dir)
+                 for path in files]
+    else:
+        task = _process_roster_task
+        tasks = [(path, args.reference, args.output, args.format) for path in files]
+    start = time.perf_counter()
+    results = []
+    with Pool(workers) as pool:
+        for result in pool.imap_unordered(task, tasks):
+            results.append(result)
+            if "error" in result:
+                print(f"FAILED {result['file']}: {result['error']}")
+            else:
+                print(f"{result['file']}: {result['rows']} rows in {result['seconds']:.2f}s ({result['rows_per_second']:.1f} rows/s)")
+
+    elapsed = time.perf_counter() - start
+    total_rows = sum(r.get("rows", 0) for r in results)
+    failed = [r for r in results if "error" in r]
+    print(
+        f"Done: {len(results) - len(failed)}/{len(results)} files, {total_rows} rows in {elapsed:.2f}s "
+        f"({total_rows / elapsed if elapsed else 0.0:.1f} rows/s overall)"
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
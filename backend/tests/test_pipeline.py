@@ -0,0 +1,64 @@
+import os
+
+import pandas as pd
+import pytest
+
+import pipeline
+
+ROSTER = os.path.join(os.path.dirname(__file__), "..", "..", "data", "provider_roster_with_errors.csv")
+
+# Duplicate pairs found in the sample roster with the default threshold and block budget
+SAMPLE_DUPLICATE_PAIRS = [
+    ("PR_00001", "PR_00501"), ("PR_00002", "PR_00502"), ("PR_00003", "PR_00503"), ("PR_00004", "PR_00504"),
+    ("PR_00005", "PR_00505"), ("PR_00006", "PR_00506"), ("PR_00006", "PR_00507"), ("PR_00007", "PR_00508"),
+    ("PR_00008", "PR_00509"), ("PR_00009", "PR_00510"), ("PR_00010", "PR_00511"), ("PR_00011", "PR_00512"),
+    ("PR_00012", "PR_00513"), ("PR_00013", "PR_00514"), ("PR_00014", "PR_00515"), ("PR_00015", "PR_00516"),
+    ("PR_00016", "PR_00517"), ("PR_00016", "PR_00518"), ("PR_00017", "PR_00519"), ("PR_00018", "PR_00520"),
+    ("PR_00018", "PR_00521"), ("PR_00019", "PR_00522"), ("PR_00020", "PR_00523"), ("PR_00020", "PR_00524"),
+    ("PR_00506", "PR_00507"), ("PR_00517", "PR_00518"), ("PR_00520", "PR_00521"), ("PR_00523", "PR_00524"),
+]
+
+
+@pytest.fixture(scope="module")
+def roster():
+    return pd.read_csv(ROSTER)
+
+
+@pytest.mark.parametrize("threshold", [0.5, pipeline.DEDUP_THRESHOLD, 0.9])
+def test_pruning_does_not_change_duplicates(roster, threshold):
+    pruned_df, _, pruned_clusters, summary = pipeline.DuplicateDetector(threshold=threshold).detect(roster)
+    full_df, _, full_clusters, full_summary = pipeline.DuplicateDetector(threshold=threshold, prune=False).detect(roster)
+    pd.testing.assert_frame_equal(pruned_df, full_df)
+    assert pruned_clusters == full_clusters
+    assert full_summary["pruned_pairs"] == 0
+    # The name filter predates bound pruning and is reported on its own
+    assert summary["name_filtered_pairs"] == full_summary["name_filtered_pairs"]
+
+
+def test_default_budget_finds_the_sample_duplicates(roster):
+    detector = pipeline.DuplicateDetector(threshold=pipeline.DEDUP_THRESHOLD)
+    dup_df = detector.detect(roster)[0]
+    assert sorted(zip(dup_df["provider_id_1"], dup_df["provider_id_2"])) == SAMPLE_DUPLICATE_PAIRS
+    # No sample block exceeds the default budget, so sub-blocking changes nothing here
+    assert detector.block_stats == {"oversized_blocks": 0, "sub_blocks": 0, "dropped_blocks": 0}
+
+
+def test_sub_blocking_is_a_no_op_within_budget(roster):
+    split = pipeline.DuplicateDetector(threshold=pipeline.DEDUP_THRESHOLD)
+    drop = pipeline.DuplicateDetector(threshold=pipeline.DEDUP_THRESHOLD, sub_block=False)
+    proc = split.preprocess(roster)
+    assert split.candidate_pairs(split.create_blocks(proc)) == drop.candidate_pairs(drop.create_blocks(proc))
+
+
+def test_batch_mode_refuses_inputs_sharing_an_output_name(tmp_path, capsys):
+    for relative in ("a/x.csv", "b/x.csv", "a/x.parquet", "a/y.csv"):
+        path = tmp_path / relative
+        path.parent.mkdir(exist_ok=True)
+        path.write_text("provider_id\n")
+    with pytest.raises(SystemExit) as exit_info:
+        pipeline.main([str(tmp_path / "a"), str(tmp_path / "b"), "--output", str(tmp_path / "out"), "--out-of-core"])
+    assert exit_info.value.code == 2
+    error = capsys.readouterr().err
+    assert "x <- " in error and "y <- " not in error
+    assert not (tmp_path / "out").exists()
+
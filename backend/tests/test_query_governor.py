@@ -0,0 +1,64 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.services.query_governor import QueryGovernor
+
+
+@pytest.fixture
+def review():
+    governor = QueryGovernor()
+    db = Session(create_engine("sqlite://"))
+    return lambda sql, row_limit=1000: governor.review(db, sql, row_limit)
+
+
+@pytest.mark.parametrize("sql, governed", [
+    ("SELECT * FROM merged_roster", "SELECT * FROM merged_roster LIMIT 1000"),
+    ("SELECT * FROM merged_roster LIMIT 999999999", "SELECT * FROM merged_roster LIMIT 1000"),
+    ("SELECT * FROM merged_roster LIMIT 50", "SELECT * FROM merged_roster LIMIT 50"),
+    ("SELECT npi FROM merged_roster LIMIT 20, 5000", "SELECT npi FROM merged_roster LIMIT 1000 OFFSET 20"),
+    ("SELECT npi FROM merged_roster LIMIT 5000 OFFSET 20", "SELECT npi FROM merged_roster LIMIT 1000 OFFSET 20"),
+    (
+        "SELECT npi FROM merged_roster WHERE npi IN (SELECT npi FROM duplicates LIMIT 5)",
+        "SELECT npi FROM merged_roster WHERE npi IN (SELECT npi FROM duplicates LIMIT 5) LIMIT 1000",
+    ),
+    (
+        "SELECT npi FROM merged_roster LIMIT 10 + 5",
+        "SELECT * FROM (SELECT npi FROM merged_roster LIMIT 10 + 5) AS limited LIMIT 1000",
+    ),
+])
+def test_every_statement_is_capped(review, sql, governed):
+    assert review(sql) == governed
+
+
+def test_page_is_cut_by_the_database():
+    governor = QueryGovernor()
+    db = Session(create_engine("sqlite://"))
+    governed = governor.review(db, "SELECT * FROM merged_roster LIMIT 999999999", 1000, page=(40, 21))
+    assert governed == "SELECT * FROM (SELECT * FROM merged_roster LIMIT 1000) AS page LIMIT 21 OFFSET 40"
+
+
+def test_cap_depends_on_row_limit(review):
+    sql = "SELECT * FROM merged_roster LIMIT 100000"
+    assert review(sql, 1000).endswith("LIMIT 1000")
+    assert review(sql, 100000).endswith("LIMIT 100000")
+
+
+@pytest.mark.parametrize("sql", [
+    "DELETE FROM merged_roster",
+    "SELECT 1; DROP TABLE merged_roster",
+    "SELECT * FROM merged_roster FOR UPDATE",
+    "SELECT * FROM merged_roster FOR SHARE",
+    "SELECT * FROM merged_roster LOCK IN SHARE MODE",
+    "SELECT SLEEP(10)",
+])
+def test_unsafe_statements_are_rejected(review, sql):
+    with pytest.raises(HTTPException) as rejection:
+        review(sql)
+    assert rejection.value.status_code == 400
+
+
+def test_for_outside_a_locking_clause_is_allowed(review):
+    sql = "SELECT SUBSTRING(full_name FROM 1 FOR 3) FROM merged_roster"
+    assert review(sql) == f"{sql} LIMIT 1000"
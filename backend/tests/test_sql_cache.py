@@ -0,0 +1,67 @@
+import pytest
+
+from app.utils.sql_cache import SQLCache
+
+SQL = "SELECT COUNT(*) FROM merged_roster WHERE license_expiration < CURDATE()"
+
+
+@pytest.fixture
+def cache():
+    return SQLCache(max_entries=64)
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("How many providers have expired licenses", "How many providers have not expired licenses"),
+    ("How many providers are accepting new patients", "How many providers are not accepting new patients"),
+    ("List providers with an NPI", "List providers without an NPI"),
+    ("Which providers never updated their records", "Which providers updated their records"),
+    (
+        "How many board certified cardiologists with active licenses practice in california and accept new patients",
+        "How many board certified cardiologists with active licenses practice in oregon and accept new patients",
+    ),
+    ("How many providers are in CA", "How many providers are in NY"),
+    ("Show providers in San Diego", "Show providers in San Jose"),
+    ("List the top 5 specialties", "List the top 10 specialties"),
+])
+def test_different_question_misses(cache, cached, asked):
+    cache.remember(cached, SQL)
+    assert cache.lookup(asked) is None
+    assert cache.lookup(cached) == SQL
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("How many providers have expired licenses?", "how many providers have expired licenses"),
+    ("Show me the providers in California", "list provider in california"),
+    ("Which providers in Texas are board certified", "board certified providers in texas"),
+])
+def test_rephrasing_hits(cache, cached, asked):
+    cache.remember(cached, SQL)
+    assert cache.lookup(asked) == SQL
+
+
+def test_forget_removes_rephrasings(cache):
+    cache.remember("Show me the providers in California", SQL)
+    cache.forget("providers in california")
+    assert cache.lookup("Show me the providers in California") is None
+
+
+def test_stats_count_exact_and_similar_hits(cache):
+    cache.remember("How many providers are in CA", SQL)
+    cache.lookup("How many providers are in CA")
+    cache.lookup("how many provider in ca")
+    cache.lookup("How many providers are in NY")
+    stats = cache.stats()
+    assert (stats["hits"], stats["similar_hits"], stats["misses"]) == (1, 1, 1)
+
+
+def test_persisted_entries_reload(tmp_path):
+    path = tmp_path / "sql_cache.json"
+    cache = SQLCache(max_entries=64, path=str(path))
+    cache.remember("How many providers are in CA", SQL)
+    cache.remember("How many providers are in NY", "SELECT 2")
+    cache.forget("How many providers are in NY")
+
+    reloaded = SQLCache(max_entries=64, path=str(path))
+    assert reloaded.lookup("how many providers in ca") == SQL
+    assert reloaded.lookup("How many providers are in NY") is None
+    assert [p.name for p in tmp_path.iterdir()] == ["sql_cache.json"]
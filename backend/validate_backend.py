@@ -139,7 +139,7 @@ def validate_fastapi_app():
         
         # Check routes
         routes = [route.path for route in app.routes]
-        expected_routes = ["/", "/health", "/query", "/providers", "/providers/duplicates", "/analytics/specialty-experience", "/analytics/providers-by-specialty", "/analytics/providers-by-state"]
+        expected_routes = ["/", "/health", "/health/live", "/health/ready", "/metrics", "/query", "/providers", "/providers/duplicates", "/analytics/specialty-experience", "/analytics/providers-by-specialty", "/analytics/providers-by-state", "/analytics/providers-by-city", "/analytics/license-expirations"]
         
         missing_routes = []
         for expected_route in expected_routes: